@@ -13,10 +13,22 @@ Lancement :
 from __future__ import annotations
 
 import datetime as dt
+import functools
+import re
+import time
+import traceback
+import zoneinfo
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import numpy as np
 import pandas as pd
+from scipy.optimize import brentq
 import streamlit as st
-import yfinance as yf
+
+try:
+    import plotly.graph_objects as go
+    HAS_PLOTLY = True
+except ImportError:
+    HAS_PLOTLY = False
 
 # ── Modules extraits ──
 from config import (
@@ -26,7 +38,7 @@ from config import (
 from engine.black_scholes import (
     black_scholes_delta, black_scholes_price, black_scholes_gamma,
     black_scholes_theta, black_scholes_vega,
-    compute_leg_greeks, simulate_pnl, estimate_take_profit_spot,
+    compute_leg_greeks, simulate_pnl, make_pnl_fn, legs_to_soa, estimate_take_profit_spot,
     compute_real_probabilities,
 )
 from engine.strategy import (
@@ -35,10 +47,13 @@ from engine.strategy import (
 )
 from engine.indicators import (
     compute_iv_rank, compute_historical_vol, compute_trend_and_risk_data,
+    REJECTED_ALIGNMENTS,
 )
 from data.hybrid_provider import HybridProvider
+from data.provider import DataProvider
+from data.yfinance_provider import cached_ticker, download_history
 from data.trade_db import TradeDB
-from ui.styles import inject_css
+from ui.styles import inject_css, inject_lite_css
 
 # ── Trade journal (SQLite) ──
 _trade_db = TradeDB()
@@ -52,21 +67,280 @@ def _init_provider():
 
 _provider = _init_provider()
 
+# Cache des données de marché entre les reruns Streamlit :
+# TTL court pour le spot / l'indice de vol, plus long pour l'IV Rank (historique 1 an).
+# La source (IBKR / yfinance) est mise en cache avec la valeur : sur un hit, le
+# provider n'est pas appelé et son last_source ne décrit pas cette valeur.
+@st.cache_data(ttl=60, show_spinner=False)
+def get_spot_quote(ticker: str) -> tuple[float, str]:
+    spot = _provider.get_spot_price(ticker)
+    return spot, _provider.last_source.get("get_spot_price", "yfinance")
+
+@st.cache_data(ttl=60, show_spinner=False)
+def get_vol_quote(ticker: str) -> tuple[float, str, str]:
+    value, vol_symbol = _provider.get_vol_index(ticker)
+    return value, vol_symbol, _provider.last_source.get("get_vol_index", "yfinance")
+
 def get_spot_price(ticker: str) -> float:
-    return _provider.get_spot_price(ticker)
+    return get_spot_quote(ticker)[0]
 
 def get_vol_index(ticker: str) -> tuple[float, str]:
-    return _provider.get_vol_index(ticker)
+    return get_vol_quote(ticker)[:2]
+
+# Historique de prix : partagé par le moteur (vol. réalisée), SMA/RSI et les graphiques
+@st.cache_data(ttl=900, show_spinner=False)
+def get_price_history(ticker: str, period: str = "6mo") -> pd.DataFrame:
+    return cached_ticker(ticker).history(period=period)
 
+# ── Téléchargements groupés yfinance (scanner) ──
+def _history_from_batch(batch: pd.DataFrame, sym: str) -> pd.DataFrame | None:
+    """Historique de sym extrait d'un yf.download(group_by="ticker"), ou None si absent."""
+    try:
+        hist = batch[sym].dropna(how="all")
+    except KeyError:
+        return None
+    return hist if not hist.empty else None
+
+def _vol_from_batch(batch: pd.DataFrame, ticker: str) -> tuple[float, str] | None:
+    """Indice de vol du ticker depuis le batch (même fallback ^VIX que le provider)."""
+    vol_symbol = VOL_INDEX_MAP.get(ticker, "^VIX")
+    for sym in (vol_symbol, "^VIX"):
+        hist = _history_from_batch(batch, sym)
+        if hist is not None:
+            return float(hist["Close"].iloc[-1]), sym
+    return None
+
+def _last_months(hist: pd.DataFrame, months: int = 6) -> pd.DataFrame:
+    """Fenêtre des `months` derniers mois d'un historique quotidien."""
+    return hist.loc[hist.index[-1] - pd.DateOffset(months=months):]
+
+def get_analysis_history(ticker: str) -> pd.DataFrame:
+    """Historique 6 mois de l'analyse : tranche de l'historique 1 an (partagé avec l'IV Rank)."""
+    hist_1y = get_price_history(ticker, "1y")
+    return _last_months(hist_1y) if not hist_1y.empty else hist_1y
+
+# IV Rank : un an de clôtures, ne change qu'une fois par séance → clé
+# (ticker, date NY) = invalidation quotidienne. Cache mémoire uniquement : le
+# stockage disque de Streamlit n'évince jamais ses fichiers (un par ticker et
+# par jour). Le ttl d'une journée purge les dates passées, max_entries borne
+# en plus le nombre d'entrées vivantes.
+@st.cache_data(ttl=24 * 3600, max_entries=len(TICKER_LIST) * 2, show_spinner=False)
+def _iv_rank_for_day(ticker: str, ny_date: str) -> float:
+    return compute_iv_rank(ticker)
+
+def get_iv_rank(ticker: str) -> float:
+    return _iv_rank_for_day(ticker, dt.datetime.now(_market_zones()[0]).date().isoformat())
+
+# Chaînes d'options : @st.cache_resource (pas de pickle des DataFrames à chaque hit).
+# INVARIANT : les DataFrames retournés sont partagés entre reruns et threads —
+# ils sont en lecture seule. Le moteur ne fait que les filtrer et les indexer
+# (masques, .iloc) sans jamais y assigner ; tout nouveau code qui doit en
+# modifier une colonne travaille sur son propre .copy().
+@st.cache_resource(ttl=30, show_spinner=False)
 def get_options_chain(ticker: str):
     return _provider.get_options_chain(ticker)
 
+@st.cache_resource(ttl=30, show_spinner=False)
 def get_leaps_chain(ticker: str):
     return _provider.get_leaps_chain(ticker)
 
+@st.cache_resource(ttl=30, show_spinner=False)
 def get_short_term_chain(ticker: str):
     return _provider.get_short_term_chain(ticker)
 
+
+@st.cache_resource(show_spinner=False)
+def _market_zones():
+    """Fuseaux (ET, local) résolus une seule fois par processus."""
+    return zoneinfo.ZoneInfo("America/New_York"), dt.datetime.now().astimezone().tzinfo
+
+
+def _compute_market_hours() -> dict:
+    """État du marché US (NYSE) : {"open": bool, "msg": str}.
+
+    Le message (vide si ouvert) indique les horaires et la prochaine ouverture
+    en heure locale.
+    """
+    _et, _local_tz = _market_zones()
+    _now_et = dt.datetime.now(_et)
+    _open_et = _now_et.replace(hour=9, minute=30, second=0, microsecond=0)
+    _close_et = _now_et.replace(hour=16, minute=0, second=0, microsecond=0)
+    _is_weekday = _now_et.weekday() < 5
+    _market_open = _is_weekday and _open_et <= _now_et <= _close_et
+    if _market_open:
+        return {"open": True, "msg": ""}
+
+    # Calcul de la prochaine ouverture en heure locale
+    _next_open_et = _open_et
+    if _now_et >= _close_et or not _is_weekday:
+        # Lun-Jeu → +1, Ven → +3 (lundi), Sam → +2, Dim → +1
+        _days = (1, 1, 1, 1, 3, 2, 1)[_now_et.weekday()]
+        _nd = _now_et + dt.timedelta(days=_days)
+        _next_open_et = _nd.replace(hour=9, minute=30, second=0, microsecond=0)
+    _next_open_local = _next_open_et.astimezone(_local_tz)
+    _open_local = _open_et.astimezone(_local_tz)
+    _close_local = _close_et.astimezone(_local_tz)
+    return {
+        "open": False,
+        "msg": (
+            f"Le marché US (NYSE) est actuellement **fermé**.\n\n"
+            f"Heures d'ouverture : **{_open_local.strftime('%Hh%M')} – {_close_local.strftime('%Hh%M')}** (heure locale), du lundi au vendredi.\n\n"
+            f"🕐 Prochaine ouverture : **{_next_open_local.strftime('%A %d/%m à %Hh%M')}**"
+        ),
+    }
+
+
+@st.cache_resource(show_spinner=False)
+def _ticker_labels() -> dict[str, str]:
+    """Libellés du sélecteur de ticker, formatés une seule fois par processus."""
+    return {t: f"{TICKER_CATEGORY[t]}  ·  {t} — {TICKER_NAMES[t]}" for t in TICKER_LIST}
+
+
+@functools.lru_cache(maxsize=64)
+def _greeks_html(delta_val: float, gamma_val: float, theta_val: float,
+                 vega_val: float, iv_val: float) -> str:
+    """Carte HTML des grecques nettes (mémorisée : mêmes valeurs → même chaîne)."""
+    return f'''
+    <div class="greeks-container">
+        <div class="greek-card">
+            <div class="greek-hint">
+                <div class="greek-hint-title">Delta (Δ)</div>
+                <div class="greek-hint-text">Sensibilité au prix du sous-jacent. Un delta de +50 signifie que si l'action bouge de 1$, la position gagne/perd ~50$.</div>
+            </div>
+            <div class="greek-symbol">Delta (Δ)</div>
+            <div class="greek-value">{delta_val:+.2f}</div>
+        </div>
+        <div class="greek-card">
+            <div class="greek-hint">
+                <div class="greek-hint-title">Gamma (Γ)</div>
+                <div class="greek-hint-text">Accélération du Delta. Un gamma élevé signifie que le Delta changera rapidement si le prix bouge. Risque accru proche de l'expiration.</div>
+            </div>
+            <div class="greek-symbol">Gamma (Γ)</div>
+            <div class="greek-value">{gamma_val:+.2f}</div>
+        </div>
+        <div class="greek-card">
+            <div class="greek-hint">
+                <div class="greek-hint-title">Theta (Θ)</div>
+                <div class="greek-hint-text">Déclin temporel journalier en $. Un theta négatif = la position perd de la valeur chaque jour. Positif = vous profitez du passage du temps.</div>
+            </div>
+            <div class="greek-symbol">Theta (Θ)</div>
+            <div class="greek-value">{theta_val:+.2f}</div>
+        </div>
+        <div class="greek-card">
+            <div class="greek-hint">
+                <div class="greek-hint-title">Vega (ν)</div>
+                <div class="greek-hint-text">Sensibilité à la volatilité implicite. Indique le gain/perte pour chaque 1% de hausse de l'IV. Vega positif profite d'une hausse de la vol.</div>
+            </div>
+            <div class="greek-symbol">Vega (ν)</div>
+            <div class="greek-value">{vega_val:+.2f}</div>
+        </div>
+        <div class="greek-card">
+            <div class="greek-hint">
+                <div class="greek-hint-title">Vol. Implicite</div>
+                <div class="greek-hint-text">Volatilité implicite actuelle du marché pour ces options. Elle mesure l'anticipation de mouvement futur du sous-jacent par le marché.</div>
+            </div>
+            <div class="greek-symbol">IV</div>
+            <div class="greek-value">{iv_val:.1f}%</div>
+        </div>
+    </div>
+    '''
+
+
+# ── Niveaux de prix sur la courbe P&L au time-stop (21 DTE restants) ──
+
+def _nearest_crossing(spots: np.ndarray, pnls: np.ndarray, target_pnl: float,
+                      current_spot: float, pnl_at) -> float:
+    """Trouve sur la courbe (spots, pnls) le spot le plus proche du spot actuel
+    où le P&L croise le seuil cible. Gère tous les types de stratégies
+    (monotones et non-monotones comme les Iron Condors) : la courbe sert à
+    encadrer les croisements, le plus proche est affiné par Brent sur pnl_at."""
+    # Tous les croisements (changement de signe de pnl - target), vectorisé
+    diff = pnls - target_pnl
+    idx = np.flatnonzero(diff[:-1] * diff[1:] <= 0)
+    if idx.size:
+        diff_a, diff_b = diff[idx], diff[idx + 1]
+        gap = np.abs(diff_b - diff_a)
+        # Interpolation linéaire (milieu du segment si le P&L y est plat)
+        frac = np.divide(np.abs(diff_a), gap, out=np.full(idx.size, 0.5), where=gap > 1e-10)
+        crossings = spots[idx] + frac * (spots[idx + 1] - spots[idx])
+        # Croisement le plus proche du spot actuel, affiné dans son encadrement
+        i = idx[np.argmin(np.abs(crossings - current_spot))]
+        try:
+            return float(brentq(lambda s: pnl_at(s) - target_pnl, spots[i], spots[i + 1],
+                                xtol=current_spot * 1e-4, maxiter=30))
+        except (ValueError, RuntimeError):
+            return float(crossings[np.argmin(np.abs(crossings - current_spot))])
+    # Pas de croisement : retourner le spot qui donne le P&L le plus proche du target
+    return float(spots[np.argmin(np.abs(diff))])
+
+
+def _crossings(spots: np.ndarray, pnls: np.ndarray, threshold: float) -> list[float]:
+    """Tous les croisements du seuil, triés par spot croissant (spots l'est déjà)."""
+    diff = pnls - threshold
+    diff_a, diff_b = diff[:-1], diff[1:]
+    idx = np.flatnonzero((diff_a * diff_b <= 0) & (np.abs(diff_a - diff_b) > 0.01))
+    a, b = np.abs(diff_a[idx]), np.abs(diff_b[idx])
+    return (spots[idx] + a / (a + b) * (spots[idx + 1] - spots[idx])).tolist()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _pnl_levels(legs: list, spot: float, sigma: float, qty: int,
+                take_profit_val: float, max_risk_val: float) -> dict:
+    """Courbe P&L (±50 % du spot), spots cibles TP / BE / ML et croisements de
+    chaque seuil (zones du graphique).
+
+    Échantillonnage adaptatif : 65 points réguliers, puis 15 points
+    supplémentaires dans chaque intervalle où le P&L franchit 0, le TP ou le
+    seuil de perte max — la résolution n'est dense qu'autour des croisements.
+    """
+    ml_threshold = -max_risk_val * 0.95
+    coarse = np.linspace(spot * 0.50, spot * 1.50, 65)
+    pnl_at = make_pnl_fn(legs, 21, sigma, qty)
+    coarse_pnls = pnl_at(coarse)
+    brackets = np.unique(np.concatenate([
+        np.flatnonzero((coarse_pnls[:-1] - t) * (coarse_pnls[1:] - t) <= 0)
+        for t in (0, take_profit_val, ml_threshold)
+    ]))
+    if brackets.size:
+        refine = np.linspace(coarse[brackets], coarse[brackets + 1], 17)[1:-1].ravel()
+        sweep_spots = np.concatenate([coarse, refine])
+        sweep_pnls = np.concatenate([coarse_pnls, pnl_at(refine)])
+        order = np.argsort(sweep_spots)
+        sweep_spots, sweep_pnls = sweep_spots[order], sweep_pnls[order]
+    else:
+        sweep_spots, sweep_pnls = coarse, coarse_pnls
+    return {
+        "sweep_spots": sweep_spots,
+        "sweep_pnls": sweep_pnls,
+        "spot_tp": _nearest_crossing(sweep_spots, sweep_pnls, take_profit_val, spot, pnl_at),
+        "spot_be": _nearest_crossing(sweep_spots, sweep_pnls, 0, spot, pnl_at),
+        "spot_ml": _nearest_crossing(sweep_spots, sweep_pnls, ml_threshold, spot, pnl_at),
+        "be": _crossings(sweep_spots, sweep_pnls, 0),
+        "tp": _crossings(sweep_spots, sweep_pnls, take_profit_val),
+        "ml": _crossings(sweep_spots, sweep_pnls, ml_threshold),
+    }
+
+
+class _CachedProvider(DataProvider):
+    """DataProvider passé à build_strategy : sert les données depuis les caches Streamlit."""
+
+    def get_spot_price(self, ticker: str) -> float:
+        return get_spot_price(ticker)
+
+    def get_vol_index(self, ticker: str) -> tuple[float, str]:
+        return get_vol_index(ticker)
+
+    def get_options_chain(self, ticker: str, target_dte: int = 45):
+        return get_options_chain(ticker)
+
+    def get_leaps_chain(self, ticker: str):
+        return get_leaps_chain(ticker)
+
+    def get_short_term_chain(self, ticker: str):
+        return get_short_term_chain(ticker)
+
+_cached_provider = _CachedProvider()
+
 # ──────────────────────────────────────────────
 # 1. CONFIGURATION & THÈME
 # ──────────────────────────────────────────────
@@ -109,7 +383,7 @@ with st.sidebar:
         options=TICKER_LIST,
         index=None,
         placeholder="Tapez un ticker… (ex: SPY, AAPL)",
-        format_func=lambda t: f"{TICKER_CATEGORY[t]}  ·  {t} — {TICKER_NAMES[t]}",
+        format_func=_ticker_labels().__getitem__,
         help="Sélectionnez ou tapez un symbole boursier (ex: SPY, AAPL, TSLA)",
     )
 
@@ -130,41 +404,23 @@ with st.sidebar:
         index=0,
     )
 
+    if st.toggle("🪶 Mode allégé", help="Désactive les effets de flou (affichage plus fluide sur les machines modestes)."):
+        inject_lite_css()
+
     st.markdown("---")
 
     # ── Détection horaires de marché US (NYSE) ──
-    import zoneinfo as _zi
+    # Résultat réutilisé pendant 60 s : il ne change qu'à la minute près
     _market_open = True
     _market_hours_msg = ""
     try:
-        _et = _zi.ZoneInfo("America/New_York")
-        _now_et = dt.datetime.now(_et)
-        _local_tz = dt.datetime.now().astimezone().tzinfo
-        _open_et = _now_et.replace(hour=9, minute=30, second=0, microsecond=0)
-        _close_et = _now_et.replace(hour=16, minute=0, second=0, microsecond=0)
-        _is_weekday = _now_et.weekday() < 5
-        _market_open = _is_weekday and _open_et <= _now_et <= _close_et
-
-        if not _market_open:
-            # Calcul de la prochaine ouverture en heure locale
-            _next_open_et = _open_et
-            if _now_et >= _close_et or not _is_weekday:
-                _days = 1
-                _nd = _now_et + dt.timedelta(days=_days)
-                while _nd.weekday() >= 5:
-                    _days += 1
-                    _nd = _now_et + dt.timedelta(days=_days)
-                _next_open_et = _nd.replace(hour=9, minute=30, second=0, microsecond=0)
-            _next_open_local = _next_open_et.astimezone(_local_tz)
-            _open_local = dt.datetime.now(_et).replace(hour=9, minute=30).astimezone(_local_tz)
-            _close_local = dt.datetime.now(_et).replace(hour=16, minute=0).astimezone(_local_tz)
-            _market_hours_msg = (
-                f"Le marché US (NYSE) est actuellement **fermé**.\n\n"
-                f"Heures d'ouverture : **{_open_local.strftime('%Hh%M')} – {_close_local.strftime('%Hh%M')}** (heure locale), du lundi au vendredi.\n\n"
-                f"🕐 Prochaine ouverture : **{_next_open_local.strftime('%A %d/%m à %Hh%M')}**"
-            )
+        _mh = st.session_state.get("_mh")
+        if not _mh or time.monotonic() - _mh["ts"] > 60:
+            _mh = {"ts": time.monotonic(), **_compute_market_hours()}
+            st.session_state["_mh"] = _mh
+        _market_open, _market_hours_msg = _mh["open"], _mh["msg"]
     except Exception:
-        _market_open = True  # en cas d'erreur, on laisse passer
+        _market_open, _market_hours_msg = True, ""  # en cas d'erreur, on laisse passer
 
     # ── Mode hors-séance (bypass si IBKR connecté) ──
     _force_analysis = False
@@ -179,6 +435,12 @@ with st.sidebar:
     analyze_btn = st.button("🔍  Analyser", use_container_width=True, type="primary", disabled=not _can_analyze)
     scan_btn = st.button("🔎  Scanner Tous les Tickers", use_container_width=True, disabled=not _can_analyze)
 
+    if st.button("🔄 Rafraîchir les données", use_container_width=True):
+        st.cache_data.clear()  # Vide le cache spot / vol / IV Rank
+        for _chain_fn in (get_options_chain, get_leaps_chain, get_short_term_chain):
+            _chain_fn.clear()
+        st.rerun()
+
     st.markdown("---")
     st.caption("📊 Options Robo-Advisor v1.0")
     st.caption("Méthodologie : Tastytrade / VRP")
@@ -202,59 +464,117 @@ if scan_btn:
     st.markdown(f"Budget : **${budget:,.0f}** · Scan **Haussier + Neutre + Baissier**")
     st.markdown("---")
 
-    scan_results = []
+    # Résultats en colonnes (structure-of-arrays) : pas d'inférence de schéma
+    # sur une liste de dicts à la construction du DataFrame.
+    scan_cols = {c: [] for c in (
+        "Ticker", "Nom", "Budget Min", "Biais", "Stratégie", "Perte Max", "Gain Max / 2",
+        "% TP", "% BE", "% Perte", "% Loss", "EV", "EV Yield", "ROC Ann.",
+        "SMA 50", "RSI", "Écart SMA (%)", "Tendance", "Earnings",
+    )}
     progress_bar = st.progress(0, text="Initialisation du scan…")
     status_text = st.empty()
     total = len(TICKER_LIST)
     biases = ["Haussier", "Neutre", "Baissier"]
 
-    for i, t in enumerate(TICKER_LIST):
-        progress_bar.progress((i + 1) / total, text=f"Scan de {t} ({i+1}/{total})…")
+    # Préchargement groupé : un seul yf.download multi-tickers (threads internes,
+    # cache parquet 5 min) sert le spot, l'indice de vol, l'IV Rank et SMA/RSI.
+    _vol_symbols = {VOL_INDEX_MAP.get(t, "^VIX") for t in TICKER_LIST} | {"^VIX"}
+    try:
+        _prefetch = download_history([*TICKER_LIST, *sorted(_vol_symbols)], period="1y")
+    except Exception:
+        _prefetch = pd.DataFrame()
+
+    def _scan_vol_index(t: str) -> tuple[float, str]:
+        """Indice de vol depuis le batch, sinon via le provider."""
+        return _vol_from_batch(_prefetch, t) or get_vol_index(t)
+
+    def _scan_one(t: str) -> list[dict]:
+        """Construit les stratégies des 3 biais pour un ticker (exécuté dans un thread worker).
+        Aucun appel Streamlit ici : la progression est mise à jour par le thread principal."""
+        # Données de marché indépendantes du biais : une seule récupération par ticker
+        hist_1y = _history_from_batch(_prefetch, t)
+        hist_6m = None
+        try:
+            if hist_1y is not None:
+                s = float(hist_1y["Close"].iloc[-1])
+                ivr = compute_iv_rank(t, hist=hist_1y)
+                hist_6m = _last_months(hist_1y)
+            else:
+                s = get_spot_price(t)
+                ivr = get_iv_rank(t)
+            v, vs = _scan_vol_index(t)
+        except Exception:
+            return []
+
+        rows = []
         for b in biases:
             try:
-                s = get_spot_price(t)
-                v, vs = get_vol_index(t)
-                ivr = compute_iv_rank(t)
-                strat = build_strategy(s, v, ivr, b, budget, t, vs, data_provider=_provider)
+                strat = build_strategy(s, v, ivr, b, budget, t, vs,
+                                       data_provider=_cached_provider, hist=hist_6m)
                 qty = strat.get("qty", 1)
-                unit_risk = round(strat["max_risk"] / qty, 2) if qty > 0 else strat["max_risk"]
+                unit_risk = strat["max_risk"] / qty if qty > 0 else strat["max_risk"]
                 # Indicateurs avancés
                 adv = compute_trend_and_risk_data(
                     t, s, b, int(strat["dte"]),
-                    strat["max_risk"], strat.get("ev", 0), strat["max_profit"]
+                    strat["max_risk"], strat.get("ev", 0), strat["max_profit"],
+                    hist=hist_6m,
                 )
-                scan_results.append({
+                rows.append({
                     "Ticker": t,
                     "Nom": TICKER_NAMES.get(t, t),
                     "Budget Min": unit_risk,
                     "Biais": b,
                     "Stratégie": strat["name"],
-                    "Perte Max": round(strat["max_risk"], 2),
-                    "Gain Max / 2": round(strat["exit_plan"]["take_profit"], 2),
+                    "Perte Max": strat["max_risk"],
+                    "Gain Max / 2": strat["exit_plan"]["take_profit"],
                     "% TP": strat.get("probabilities", {}).get("p_take_profit", 0),
                     "% BE": strat.get("probabilities", {}).get("p_breakeven", 0),
                     "% Perte": strat.get("probabilities", {}).get("p_partial_loss", 0),
                     "% Loss": strat.get("probabilities", {}).get("p_max_loss", 0),
-                    "EV": round(strat.get("ev", 0), 2),
-                    "EV Yield": round(adv["ev_yield"], 1),
-                    "ROC Ann.": round(adv["roc_annualise"], 1),
-                    "SMA 50": round(adv["sma50"], 2) if adv["sma50"] else None,
-                    "RSI": round(adv["rsi"], 1) if adv["rsi"] is not None else None,
-                    "Écart SMA (%)": round(adv["dist_sma"], 2) if adv["dist_sma"] is not None else None,
+                    "EV": strat.get("ev", 0),
+                    "EV Yield": adv["ev_yield"],
+                    "ROC Ann.": adv["roc_annualise"],
+                    "SMA 50": adv["sma50"] if adv["sma50"] else None,
+                    "RSI": adv["rsi"],
+                    "Écart SMA (%)": adv["dist_sma"],
                     "Tendance": adv["alignement"],
                     "Earnings": adv["earnings_risk"],
                 })
             except Exception:
                 continue
+        return rows
+
+    # Scan parallèle : les appels yfinance/IBKR sont I/O-bound, les threads
+    # recouvrent la latence réseau entre tickers.
+    # La barre n'est rafraîchie qu'une vingtaine de fois (un message WebSocket
+    # par mise à jour).
+    done = 0
+    progress_step = max(1, total // 20)
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        futures = {executor.submit(_scan_one, t): t for t in TICKER_LIST}
+        for future in as_completed(futures):
+            done += 1
+            if done % progress_step == 0 or done == total:
+                progress_bar.progress(done / total, text=f"Scan de {futures[future]} ({done}/{total})…")
+            for row in future.result():
+                for c, values in scan_cols.items():
+                    values.append(row[c])
 
     progress_bar.empty()
 
-    if scan_results:
-        df = pd.DataFrame(scan_results).sort_values("EV", ascending=False).reset_index(drop=True)
+    if scan_cols["Ticker"]:
+        df = pd.DataFrame(scan_cols).round({
+            "Budget Min": 2, "Perte Max": 2, "Gain Max / 2": 2, "EV": 2,
+            "EV Yield": 1, "ROC Ann.": 1, "SMA 50": 2, "RSI": 1, "Écart SMA (%)": 2,
+        })
+        df = df.sort_values("EV", ascending=False).reset_index(drop=True)
         total_found = len(df)
         # Filtre : ne garder que les cibles parfaites (pas de Rejet ni Contre-tendance)
-        df = df[~df["Tendance"].str.contains("Rejet|Contre-tendance", na=False)].reset_index(drop=True)
+        df = df[~df["Tendance"].isin(REJECTED_ALIGNMENTS)].reset_index(drop=True)
         df.index = df.index + 1  # 1-indexed
+        # Colonnes Arrow natives (pyarrow est livré avec Streamlit) :
+        # st.dataframe les sérialise sans conversion pandas → Arrow
+        df = df.convert_dtypes(dtype_backend="pyarrow")
 
         st.success(f"✅ **{len(df)} cibles validées** sur {total_found} stratégies trouvées ({total} tickers scannés).")
 
@@ -381,6 +701,14 @@ if not analyze_btn and not _has_analysis:
 
         _today = _dt_cls.now().date()
 
+        # DTE par expiration, parsé une seule fois pour le tableau et les vues détail
+        _dte_by_exp = {}
+        for _exp_str in {t.get("expiration", "") for t in _all_trades}:
+            try:
+                _dte_by_exp[_exp_str] = (dt.date.fromisoformat(_exp_str) - _today).days
+            except ValueError:
+                pass
+
         # Récupérer le spot actuel pour chaque ticker unique
         _tickers_in_journal = list({t["ticker"] for t in _all_trades})
         _current_spots = {}
@@ -413,13 +741,7 @@ if not analyze_btn and not _has_analysis:
 
             # Calcul DTE
             _exp_str = _t.get("expiration", "")
-            _dte = None
-            if _exp_str:
-                try:
-                    _exp_date = _dt_cls.strptime(_exp_str, "%Y-%m-%d").date()
-                    _dte = (_exp_date - _today).days
-                except ValueError:
-                    pass
+            _dte = _dte_by_exp.get(_exp_str)
 
             _row_class = "row-dte" if _dte is not None and _dte <= 21 else ""
 
@@ -476,10 +798,8 @@ if not analyze_btn and not _has_analysis:
                 continue
 
             # Calcul DTE
-            try:
-                _exp_date = _dt_cls.strptime(_exp_str, "%Y-%m-%d").date()
-                _dte = (_exp_date - _today).days
-            except ValueError:
+            _dte = _dte_by_exp.get(_exp_str)
+            if _dte is None:
                 continue
 
             _label = f"📊 #{_tid} — {_tk} · {_sname} · {_dte}j DTE"
@@ -661,14 +981,12 @@ if not analyze_btn and not _has_analysis:
 
                 # ── Section 4 : Chart Plotly ──
                 try:
-                    _hist = _yf_mod.Ticker(_tk).history(period="6mo")
+                    _hist = get_price_history(_tk)
                     if not _hist.empty:
-                        import plotly.graph_objects as _go
-
-                        _fig = _go.Figure()
+                        _fig = go.Figure()
 
                         # Courbe du prix
-                        _fig.add_trace(_go.Scatter(
+                        _fig.add_trace(go.Scattergl(
                             x=_hist.index, y=_hist["Close"],
                             mode="lines", name="Prix",
                             line=dict(color="#60A5FA", width=2),
@@ -678,7 +996,7 @@ if not analyze_btn and not _has_analysis:
                         # SMA 50
                         _sma50 = _hist["Close"].rolling(window=50).mean().dropna()
                         if not _sma50.empty:
-                            _fig.add_trace(_go.Scatter(
+                            _fig.add_trace(go.Scattergl(
                                 x=_sma50.index, y=_sma50,
                                 mode="lines", name="SMA 50",
                                 line=dict(color="#FBBF24", width=1.5),
@@ -822,7 +1140,7 @@ if not analyze_btn and not _has_analysis:
 ">
     <div style="font-size: 3rem; margin-bottom: 0.5rem;">🔒</div>
     <h2 style="color: #e94560; margin: 0 0 1rem 0;">Marché Fermé</h2>
-    <p style="color: #ccc; font-size: 1.1rem; line-height: 1.6;">""" + _market_hours_msg.replace('\n\n', '<br>').replace('**', '<b>', 1).replace('**', '</b>', 1).replace('**', '<b>', 1).replace('**', '</b>', 1).replace('**', '<b>', 1).replace('**', '</b>', 1) + """</p>
+    <p style="color: #ccc; font-size: 1.1rem; line-height: 1.6;">""" + re.sub(r"\*\*(.*?)\*\*", r"<b>\1</b>", _market_hours_msg.replace('\n\n', '<br>')) + """</p>
     <p style="color: #888; font-size: 0.9rem; margin-top: 1.5rem;">Les données d'options (bid/ask) ne sont pas fiables en dehors des heures de séance.<br>
     L'analyse est désactivée pour éviter des résultats incorrects.</p>
 </div>""", unsafe_allow_html=True)
@@ -847,13 +1165,17 @@ try:
     # Récupérer ou recalculer les données de marché
     if analyze_btn or "analysis_cache" not in st.session_state or st.session_state.get("analysis_ticker") != ticker:
         with st.spinner(f"🔄 Analyse de **{ticker}** en cours…"):
-            spot = get_spot_price(ticker)
-            vix, vol_symbol = get_vol_index(ticker)
+            # Spot et indice de vol via le provider (IBKR si connecté) ;
+            # l'historique 1 an (caché, partagé avec SMA/RSI) sert l'IV Rank
+            spot, src_spot = get_spot_quote(ticker)
+            vix, vol_symbol, src_vol = get_vol_quote(ticker)
+            _hist_1y = get_price_history(ticker, "1y")
+            iv_rank = compute_iv_rank(ticker, hist=_hist_1y) if not _hist_1y.empty else get_iv_rank(ticker)
             vol_label = VOL_INDEX_NAMES.get(vol_symbol, vol_symbol.replace("^", ""))
-            iv_rank = compute_iv_rank(ticker)
             st.session_state["analysis_cache"] = {
                 "spot": spot, "vix": vix, "vol_symbol": vol_symbol,
                 "vol_label": vol_label, "iv_rank": iv_rank,
+                "src_spot": src_spot, "src_vol": src_vol,
             }
     else:
         # Utiliser le cache pour les reruns (bouton ordre, etc.)
@@ -863,11 +1185,11 @@ try:
         vol_symbol = _cache["vol_symbol"]
         vol_label = _cache["vol_label"]
         iv_rank = _cache["iv_rank"]
+        src_spot = _cache.get("src_spot", "yfinance")
+        src_vol = _cache.get("src_vol", "yfinance")
 
     # ─── Section 1 : CONTEXTE MACRO ───
     # Badge source de données
-    src_spot = _provider.last_source.get("get_spot_price", "yfinance")
-    src_vol = _provider.last_source.get("get_vol_index", "yfinance")
     src_chain = _provider.last_source.get("get_options_chain", "yfinance")
     src_icon = lambda s: "🟢" if s == "IBKR" else "🟡"
     st.caption(
@@ -907,10 +1229,13 @@ try:
     # ─── Section 2 : STRATÉGIE ───
     if analyze_btn or "strategy_cache" not in st.session_state or st.session_state.get("analysis_ticker") != ticker:
         with st.spinner("🧠 Construction de la stratégie optimale…"):
-            strategy = build_strategy(spot, vix, iv_rank, bias, budget, ticker, vol_symbol, data_provider=_provider)
+            _hist_6m = get_analysis_history(ticker)
+            strategy = build_strategy(spot, vix, iv_rank, bias, budget, ticker, vol_symbol,
+                                      data_provider=_cached_provider, hist=_hist_6m)
             adv_data = compute_trend_and_risk_data(
                 ticker, spot, bias, int(strategy["dte"]),
-                strategy["max_risk"], strategy.get("ev", 0), strategy["max_profit"]
+                strategy["max_risk"], strategy.get("ev", 0), strategy["max_profit"],
+                hist=_hist_6m,
             )
             st.session_state["strategy_cache"] = strategy
             st.session_state["adv_data_cache"] = adv_data
@@ -932,19 +1257,41 @@ try:
 
     qty = strategy.get("qty", 1)
 
-    legs_data = []
-    for leg in strategy["legs"]:
-        legs_data.append({
-            "Qté": qty,
-            "Action": f"{'🟢 ' if leg['action'] == 'BUY' else '🔴 '}{leg['action']}",
-            "Type": leg["type"],
-            "Strike": f"${leg['strike']:,.2f}",
-            "Expiration": leg["exp"],
-            "DTE": f"{leg['dte']}j",
-            "Prix unitaire": f"${leg['price']:.2f}",
-        })
+    def _build_render_artifacts(strategy: dict, qty: int):
+        """Construit le DataFrame des legs et le HTML des grecques (dépendent uniquement de la stratégie)."""
+        legs_data = []
+        for leg in strategy["legs"]:
+            legs_data.append({
+                "Qté": qty,
+                "Action": f"{'🟢 ' if leg['action'] == 'BUY' else '🔴 '}{leg['action']}",
+                "Type": leg["type"],
+                "Strike": f"${leg['strike']:,.2f}",
+                "Expiration": leg["exp"],
+                "DTE": f"{leg['dte']}j",
+                "Prix unitaire": f"${leg['price']:.2f}",
+            })
+        legs_df = pd.DataFrame(legs_data)
+
+        greeks = strategy.get("greeks", {})
+        greeks_html = _greeks_html(
+            greeks.get("delta", 0), greeks.get("gamma", 0), greeks.get("theta", 0),
+            greeks.get("vega", 0), greeks.get("iv", 0),
+        )
+        return legs_df, greeks_html
+
+    # Rendu mémorisé par signature de stratégie : les reruns (boutons d'ordre…)
+    # réutilisent le DataFrame et le HTML au lieu de les reconstruire.
+    _render_sig = hash((
+        ticker, strategy["name"], qty,
+        tuple((l["strike"], l["action"], l["type"], l["exp"], l["price"]) for l in strategy["legs"]),
+        tuple(sorted(strategy.get("greeks", {}).items())),
+    ))
+    _render = st.session_state.get("render_cache")
+    if _render is None or _render[0] != _render_sig:
+        _render = (_render_sig, *_build_render_artifacts(strategy, qty))
+        st.session_state["render_cache"] = _render
+    _, legs_df, greeks_html = _render
 
-    legs_df = pd.DataFrame(legs_data)
     st.dataframe(
         legs_df,
         use_container_width=True,
@@ -965,10 +1312,7 @@ try:
         st.markdown("")
 
         # Résumé de l'ordre (calculé depuis les legs)
-        _net = sum(
-            leg["price"] if leg["action"] == "SELL" else -leg["price"]
-            for leg in strategy["legs"]
-        )
+        _net = float(np.dot(strategy["leg_prices"], strategy["leg_signs"]))
         _action = "SELL" if _net > 0 else "BUY"
         _price = abs(_net)
         st.info(
@@ -1027,57 +1371,7 @@ try:
     # ─── Section 3b : GRECQUES DE LA POSITION ───
     st.markdown('<div class="section-header"><svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke-width="1.5" stroke="currentColor"><path stroke-linecap="round" stroke-linejoin="round" d="M4.26 10.147a60.438 60.438 0 0 0-.491 6.347A48.62 48.62 0 0 1 12 20.904a48.62 48.62 0 0 1 8.232-4.41 60.46 60.46 0 0 0-.491-6.347m-15.482 0a50.636 50.636 0 0 0-2.658-.813A59.906 59.906 0 0 1 12 3.493a59.903 59.903 0 0 1 10.399 5.84c-.896.248-1.783.52-2.658.814m-15.482 0A50.717 50.717 0 0 1 12 13.489a50.702 50.702 0 0 1 7.74-3.342M6.75 15a.75.75 0 1 0 0-1.5.75.75 0 0 0 0 1.5Zm0 0v-3.675A55.378 55.378 0 0 1 12 8.443m-7.007 11.55A5.981 5.981 0 0 0 6.75 15.75v-1.5" /></svg><h2>Grecques de la Position (Net)</h2></div>', unsafe_allow_html=True)
 
-    greeks = strategy.get("greeks", {})
-    delta_val = greeks.get("delta", 0)
-    gamma_val = greeks.get("gamma", 0)
-    theta_val = greeks.get("theta", 0)
-    vega_val = greeks.get("vega", 0)
-    iv_val = greeks.get("iv", 0)
-
-    st.markdown(f'''
-    <div class="greeks-container">
-        <div class="greek-card">
-            <div class="greek-hint">
-                <div class="greek-hint-title">Delta (Δ)</div>
-                <div class="greek-hint-text">Sensibilité au prix du sous-jacent. Un delta de +50 signifie que si l'action bouge de 1$, la position gagne/perd ~50$.</div>
-            </div>
-            <div class="greek-symbol">Delta (Δ)</div>
-            <div class="greek-value">{delta_val:+.2f}</div>
-        </div>
-        <div class="greek-card">
-            <div class="greek-hint">
-                <div class="greek-hint-title">Gamma (Γ)</div>
-                <div class="greek-hint-text">Accélération du Delta. Un gamma élevé signifie que le Delta changera rapidement si le prix bouge. Risque accru proche de l'expiration.</div>
-            </div>
-            <div class="greek-symbol">Gamma (Γ)</div>
-            <div class="greek-value">{gamma_val:+.2f}</div>
-        </div>
-        <div class="greek-card">
-            <div class="greek-hint">
-                <div class="greek-hint-title">Theta (Θ)</div>
-                <div class="greek-hint-text">Déclin temporel journalier en $. Un theta négatif = la position perd de la valeur chaque jour. Positif = vous profitez du passage du temps.</div>
-            </div>
-            <div class="greek-symbol">Theta (Θ)</div>
-            <div class="greek-value">{theta_val:+.2f}</div>
-        </div>
-        <div class="greek-card">
-            <div class="greek-hint">
-                <div class="greek-hint-title">Vega (ν)</div>
-                <div class="greek-hint-text">Sensibilité à la volatilité implicite. Indique le gain/perte pour chaque 1% de hausse de l'IV. Vega positif profite d'une hausse de la vol.</div>
-            </div>
-            <div class="greek-symbol">Vega (ν)</div>
-            <div class="greek-value">{vega_val:+.2f}</div>
-        </div>
-        <div class="greek-card">
-            <div class="greek-hint">
-                <div class="greek-hint-title">Vol. Implicite</div>
-                <div class="greek-hint-text">Volatilité implicite actuelle du marché pour ces options. Elle mesure l'anticipation de mouvement futur du sous-jacent par le marché.</div>
-            </div>
-            <div class="greek-symbol">IV</div>
-            <div class="greek-value">{iv_val:.1f}%</div>
-        </div>
-    </div>
-    ''', unsafe_allow_html=True)
+    st.markdown(greeks_html, unsafe_allow_html=True)
 
     st.caption("💡 Survolez chaque grecque pour comprendre sa signification")
 
@@ -1138,86 +1432,51 @@ try:
     # ─── Section 4a : INDICATEURS AVANCÉS ───
     st.markdown("### 📊 Indicateurs Avancés")
 
-    a1, a2, a3, a4, a5, a6, a7 = st.columns(7)
+    # Les 7 cartes sont émises en un seul bloc HTML (un seul élément Streamlit)
+    def _metric_card(label: str, value: str, value_class: str = "", value_style: str = "") -> str:
+        style = f' style="{value_style}"' if value_style else ""
+        return (f'<div class="fin-metric"><div class="label">{label}</div>'
+                f'<div class="value {value_class}"{style}>{value}</div></div>')
 
     ev_yield_val = adv_data["ev_yield"]
     ev_yield_color = "green" if ev_yield_val > 0 else "red"
-    with a1:
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">📈 EV Yield</div>
-            <div class="value {ev_yield_color}">{ev_yield_val:+.1f}%</div>
-        </div>
-        """, unsafe_allow_html=True)
 
     roc_val = adv_data["roc_annualise"]
     roc_color = "green" if roc_val > 0 else "red"
-    with a2:
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">🔄 ROC Annualisé</div>
-            <div class="value {roc_color}">{roc_val:,.1f}%</div>
-        </div>
-        """, unsafe_allow_html=True)
 
     sma50_val = adv_data["sma50"]
-    with a3:
-        sma50_display = f"${sma50_val:,.2f}" if sma50_val else "N/A"
-        sma50_color = "green" if sma50_val and spot > sma50_val else ("red" if sma50_val else "")
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">📊 SMA 50</div>
-            <div class="value {sma50_color}">{sma50_display}</div>
-        </div>
-        """, unsafe_allow_html=True)
+    sma50_display = f"${sma50_val:,.2f}" if sma50_val else "N/A"
+    sma50_color = "green" if sma50_val and spot > sma50_val else ("red" if sma50_val else "")
 
     rsi_val = adv_data.get("rsi")
-    with a4:
-        if rsi_val is not None:
-            rsi_color = "red" if rsi_val > 70 else ("green" if rsi_val < 30 else "")
-            rsi_display = f"{rsi_val:.1f}"
-        else:
-            rsi_color = ""
-            rsi_display = "N/A"
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">📉 RSI (14)</div>
-            <div class="value {rsi_color}">{rsi_display}</div>
-        </div>
-        """, unsafe_allow_html=True)
+    if rsi_val is not None:
+        rsi_color = "red" if rsi_val > 70 else ("green" if rsi_val < 30 else "")
+        rsi_display = f"{rsi_val:.1f}"
+    else:
+        rsi_color = ""
+        rsi_display = "N/A"
 
     dist_sma_val = adv_data.get("dist_sma")
-    with a5:
-        if dist_sma_val is not None:
-            dist_color = "red" if abs(dist_sma_val) > 10 else "green"
-            dist_display = f"{dist_sma_val:+.2f}%"
-        else:
-            dist_color = ""
-            dist_display = "N/A"
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">📏 Écart SMA (%)</div>
-            <div class="value {dist_color}">{dist_display}</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with a6:
-        trend_val = adv_data["alignement"]
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">📐 Alignement Tendance</div>
-            <div class="value" style="font-size: 1rem;">{trend_val}</div>
-        </div>
-        """, unsafe_allow_html=True)
-
-    with a7:
-        earnings_val = adv_data["earnings_risk"]
-        st.markdown(f"""
-        <div class="fin-metric">
-            <div class="label">📅 Earnings Risk</div>
-            <div class="value" style="font-size: 1rem;">{earnings_val}</div>
-        </div>
-        """, unsafe_allow_html=True)
+    if dist_sma_val is not None:
+        dist_color = "red" if abs(dist_sma_val) > 10 else "green"
+        dist_display = f"{dist_sma_val:+.2f}%"
+    else:
+        dist_color = ""
+        dist_display = "N/A"
+
+    trend_val = adv_data["alignement"]
+    earnings_val = adv_data["earnings_risk"]
+
+    adv_cards = [
+        _metric_card("📈 EV Yield", f"{ev_yield_val:+.1f}%", ev_yield_color),
+        _metric_card("🔄 ROC Annualisé", f"{roc_val:,.1f}%", roc_color),
+        _metric_card("📊 SMA 50", sma50_display, sma50_color),
+        _metric_card("📉 RSI (14)", rsi_display, rsi_color),
+        _metric_card("📏 Écart SMA (%)", dist_display, dist_color),
+        _metric_card("📐 Alignement Tendance", trend_val, value_style="font-size: 1rem;"),
+        _metric_card("📅 Earnings Risk", earnings_val, value_style="font-size: 1rem;"),
+    ]
+    st.markdown(f'<div class="card-row">{"".join(adv_cards)}</div>', unsafe_allow_html=True)
 
     st.markdown("---")
 
@@ -1236,52 +1495,25 @@ try:
     take_profit_val = strategy["exit_plan"]["take_profit"]
     max_risk_val = strategy["max_risk"]
 
-    def find_nearest_spot_for_pnl(target_pnl, legs, remaining_dte, sigma, qty, current_spot):
-        """Sweep pour trouver le spot le plus proche du spot actuel
-        où le P&L croise le seuil cible. Gère tous les types de stratégies
-        (monotones et non-monotones comme les Iron Condors)."""
-        n_pts = 500
-        spots = np.linspace(current_spot * 0.50, current_spot * 1.50, n_pts)
-        pnls = [simulate_pnl(legs, s, remaining_dte, sigma, qty) for s in spots]
-
-        # Trouver tous les croisements (changement de signe de pnl - target)
-        crossings = []
-        for i in range(len(pnls) - 1):
-            diff_a = pnls[i] - target_pnl
-            diff_b = pnls[i + 1] - target_pnl
-            if diff_a * diff_b <= 0:  # croisement
-                # Interpolation linéaire
-                if abs(diff_b - diff_a) > 1e-10:
-                    frac = abs(diff_a) / abs(diff_b - diff_a)
-                    cross_spot = spots[i] + frac * (spots[i + 1] - spots[i])
-                else:
-                    cross_spot = (spots[i] + spots[i + 1]) / 2
-                crossings.append(cross_spot)
-
-        if crossings:
-            # Retourner le croisement le plus proche du spot actuel
-            return min(crossings, key=lambda s: abs(s - current_spot))
-        else:
-            # Pas de croisement : retourner le spot qui donne le P&L le plus proche du target
-            closest_idx = min(range(len(pnls)), key=lambda i: abs(pnls[i] - target_pnl))
-            return float(spots[closest_idx])
-
+    # Courbe P&L au time-stop et niveaux TP / BE / ML, partagés avec les zones du
+    # graphique et le plan de vol ; mémorisés entre reruns pour une même stratégie
     strat_legs = strategy["legs"]
-    spot_tp = find_nearest_spot_for_pnl(take_profit_val, strat_legs, 21, current_sigma, qty_prob, spot)
-    spot_be = find_nearest_spot_for_pnl(0, strat_legs, 21, current_sigma, qty_prob, spot)
-    spot_ml = find_nearest_spot_for_pnl(-max_risk_val * 0.95, strat_legs, 21, current_sigma, qty_prob, spot)
+    strat_soa = strategy.get("legs_soa") or legs_to_soa(strat_legs)
+    levels = _pnl_levels(strat_legs, spot, current_sigma, qty_prob, take_profit_val, max_risk_val)
+    sweep_spots, sweep_pnls = levels["sweep_spots"], levels["sweep_pnls"]
+    spot_tp, spot_be, spot_ml = levels["spot_tp"], levels["spot_be"], levels["spot_ml"]
 
     pct_tp = ((spot_tp - spot) / spot) * 100
     pct_be = ((spot_be - spot) / spot) * 100
     pct_ml = ((spot_ml - spot) / spot) * 100
 
-    prob_data = [
-        {"Scénario": "🎯 Take Profit", "P&L": f"+${take_profit_val:,.0f}", "Spot Cible": f"${spot_tp:,.2f}", "Mouvement": f"{pct_tp:+.1f}%", "Probabilité (%)": p_tp},
-        {"Scénario": "⚖️ Break-Even", "P&L": "$0", "Spot Cible": f"${spot_be:,.2f}", "Mouvement": f"{pct_be:+.1f}%", "Probabilité (%)": p_be},
-        {"Scénario": "📉 Perte Partielle", "P&L": "—", "Spot Cible": f"${spot_be:,.0f} – ${spot_ml:,.0f}", "Mouvement": "—", "Probabilité (%)": p_pl},
-        {"Scénario": "💀 Perte Maximale", "P&L": f"-${max_risk_val:,.0f}", "Spot Cible": f"${spot_ml:,.2f}", "Mouvement": f"{pct_ml:+.1f}%", "Probabilité (%)": p_loss},
-    ]
-    df_prob = pd.DataFrame(prob_data)
+    df_prob = pd.DataFrame({
+        "Scénario": ["🎯 Take Profit", "⚖️ Break-Even", "📉 Perte Partielle", "💀 Perte Maximale"],
+        "P&L": [f"+${take_profit_val:,.0f}", "$0", "—", f"-${max_risk_val:,.0f}"],
+        "Spot Cible": [f"${spot_tp:,.2f}", f"${spot_be:,.2f}", f"${spot_be:,.0f} – ${spot_ml:,.0f}", f"${spot_ml:,.2f}"],
+        "Mouvement": [f"{pct_tp:+.1f}%", f"{pct_be:+.1f}%", "—", f"{pct_ml:+.1f}%"],
+        "Probabilité (%)": [p_tp, p_be, p_pl, p_loss],
+    })
     st.dataframe(
         df_prob,
         use_container_width=True,
@@ -1294,7 +1526,8 @@ try:
             "Probabilité (%)": st.column_config.ProgressColumn("Probabilité", format="%.1f%%", min_value=0, max_value=100),
         },
     )
-    hist_vol = compute_historical_vol(ticker)
+    hist_data = get_analysis_history(ticker)
+    hist_vol = compute_historical_vol(ticker, hist=hist_data)
     hist_vol_str = f"{hist_vol*100:.1f}%" if hist_vol else "N/A"
     st.caption(f"📍 Spot actuel : **${spot:,.2f}** · Évaluation au time-stop (21 DTE restants) · Vol. historique {hist_vol_str}")
 
@@ -1303,20 +1536,21 @@ try:
     # ─── Section 4c : GRAPHIQUE HISTORIQUE 6 MOIS ───
     st.markdown(f"### 📈 Historique {ticker} (6 mois)")
 
-    tk_hist = yf.Ticker(ticker)
-    hist_data = tk_hist.history(period="6mo")
-
-    if not hist_data.empty:
+    if not HAS_PLOTLY:
+        st.caption("📈 Chart indisponible (plotly non installé).")
+    elif not hist_data.empty:
       try:
-        import plotly.graph_objects as go
-        import traceback as _tb
+        # Colonnes extraites une seule fois en NumPy (prix, SMA, stats, échelle)
+        close_np = hist_data["Close"].to_numpy()
+        high_6m = float(np.nanmax(hist_data["High"].to_numpy()))
+        low_6m = float(np.nanmin(hist_data["Low"].to_numpy()))
 
         fig = go.Figure()
 
         # Courbe du prix
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=hist_data.index,
-            y=hist_data["Close"],
+            y=close_np,
             mode="lines",
             name="Prix",
             line=dict(color="#60A5FA", width=2),
@@ -1324,10 +1558,18 @@ try:
         ))
 
         # ── SMA 50 jours (historique — ligne continue) ──
-        sma50_series = hist_data["Close"].rolling(window=50).mean()
-        sma50_valid = sma50_series.dropna()
+        # Une seule moyenne glissante sur [clôtures, spot × 22] : les n - 49 premières
+        # valeurs sont la SMA historique, les suivantes sa projection (chaque jour
+        # projeté remplace le plus ancien des 50 derniers prix par le spot).
+        future_bdays = pd.bdate_range(start=hist_data.index[-1], periods=23)[1:]  # ~1 mois
+        sma50_all = np.convolve(
+            np.concatenate([close_np, np.full(len(future_bdays), spot)]),
+            np.full(50, 1 / 50), mode="valid",
+        )
+        n_hist_sma = max(0, len(close_np) - 49)
+        sma50_valid = pd.Series(sma50_all[:n_hist_sma], index=hist_data.index[49:])
         if not sma50_valid.empty:
-            fig.add_trace(go.Scatter(
+            fig.add_trace(go.Scattergl(
                 x=sma50_valid.index,
                 y=sma50_valid,
                 mode="lines",
@@ -1337,17 +1579,11 @@ try:
             ))
 
             # ── Projection SMA 50 (prix flat au spot) — pointillé ──
-            close_list = list(hist_data["Close"].values[-50:])  # derniers 50 prix
-            proj_sma_values = [float(sma50_valid.iloc[-1])]  # ancrage au dernier SMA connu
-            proj_dates = [sma50_valid.index[-1]]
-            future_bdays = pd.bdate_range(start=hist_data.index[-1], periods=23)[1:]  # ~1 mois
-            for d in future_bdays:
-                close_list.pop(0)
-                close_list.append(spot)
-                proj_sma_values.append(float(np.mean(close_list)))
-                proj_dates.append(d)
-
-            fig.add_trace(go.Scatter(
+            # Ancrée au dernier SMA connu
+            proj_sma_values = sma50_all[n_hist_sma - 1:]
+            proj_dates = [sma50_valid.index[-1], *future_bdays]
+
+            fig.add_trace(go.Scattergl(
                 x=proj_dates,
                 y=proj_sma_values,
                 mode="lines",
@@ -1357,18 +1593,19 @@ try:
             ))
 
         # ── Projection linéaire 1 mois (ancrée au dernier prix) ──
-        close_vals = hist_data["Close"].values
-        x_numeric = np.arange(len(close_vals))
-        coeffs = np.polyfit(x_numeric, close_vals, 1)
-        slope = coeffs[0]
+        # Pente des moindres carrés en forme fermée : cov(x, y) / var(x)
+        close_vals = close_np
+        x_centered = np.arange(len(close_vals), dtype=np.float64)
+        x_centered -= x_centered.mean()
+        slope = float(x_centered @ (close_vals - close_vals.mean()) / (x_centered @ x_centered))
         last_price = float(close_vals[-1])
 
         last_date = hist_data.index[-1]
         future_days = 22  # ~1 mois de trading
         future_dates = pd.bdate_range(start=last_date, periods=future_days + 1)  # inclut le dernier jour
-        future_prices = [last_price + slope * d for d in range(future_days + 1)]
+        future_prices = last_price + slope * np.arange(future_days + 1)
 
-        fig.add_trace(go.Scatter(
+        fig.add_trace(go.Scattergl(
             x=future_dates,
             y=future_prices,
             mode="lines",
@@ -1377,53 +1614,44 @@ try:
             hovertemplate="$%{y:,.2f} (proj.)<extra></extra>",
         ))
 
+        # Lignes, zones et annotations accumulées puis posées en un seul
+        # update_layout (mêmes objets que add_hline / add_hrect)
+        shapes, annotations = [], []
+
+        def _hline(y, color, dash, label, position="right"):
+            shapes.append(dict(type="line", xref="x domain", x0=0, x1=1, yref="y", y0=y, y1=y,
+                               line=dict(color=color, width=1, dash=dash)))
+            annotations.append(dict(
+                xref="x domain", x=1 if position == "right" else 0,
+                xanchor="left" if position == "right" else "right",
+                yref="y", y=y, yanchor="middle", text=label, showarrow=False,
+                font=dict(color=color, size=11),
+            ))
+
+        def _hrect(y0, y1, fillcolor):
+            shapes.append(dict(type="rect", xref="x domain", x0=0, x1=1, yref="y", y0=y0, y1=y1,
+                               fillcolor=fillcolor, line=dict(width=0), layer="below"))
+
         # Lignes horizontales pour les strikes
         legs = strategy.get("legs", [])
-        strikes = sorted(set(leg["strike"] for leg in legs))
+        # Strike → (action, type) du premier leg à ce strike ; ses clés sont les strikes uniques
+        strike_map = {}
+        for leg in legs:
+            strike_map.setdefault(leg["strike"], (leg["action"], leg["type"]))
+        strikes = sorted(strike_map)
         strike_colors = ["#F87171", "#FBBF24", "#34D399", "#A78BFA"]
         for i, s in enumerate(strikes):
             color = strike_colors[i % len(strike_colors)]
-            action = next((l["action"] for l in legs if l["strike"] == s), "")
-            opt_type = next((l["type"] for l in legs if l["strike"] == s), "")
+            action, opt_type = strike_map[s]
             label = f"{action} {opt_type} ${s:.0f}"
-            fig.add_hline(
-                y=s, line_dash="dash", line_color=color, line_width=1,
-                annotation_text=label,
-                annotation_position="right",
-                annotation_font_color=color,
-                annotation_font_size=11,
-            )
+            _hline(s, color, "dash", label)
 
         # Ligne du spot actuel
-        fig.add_hline(
-            y=spot, line_dash="dot", line_color="#94A3B8", line_width=1,
-            annotation_text=f"Spot ${spot:.0f}",
-            annotation_position="left",
-            annotation_font_color="#94A3B8",
-            annotation_font_size=11,
-        )
+        _hline(spot, "#94A3B8", "dot", f"Spot ${spot:.0f}", position="left")
 
         # ── Zones vertes (profit) et rouges (perte) ──
-        # Sweep pour trouver TOUS les breakevens, TP et ML crossings
-        n_sweep = 300
-        sweep_spots = np.linspace(spot * 0.50, spot * 1.50, n_sweep)
-        sweep_pnls = [simulate_pnl(strat_legs, s, 21, current_sigma, qty_prob) for s in sweep_spots]
-        ml_threshold = -max_risk_val * 0.95
-
-        def find_crossings(pnls, spots_arr, threshold):
-            crossings = []
-            for i in range(len(pnls) - 1):
-                diff_a = pnls[i] - threshold
-                diff_b = pnls[i + 1] - threshold
-                if diff_a * diff_b <= 0 and abs(diff_a - diff_b) > 0.01:
-                    frac = abs(diff_a) / (abs(diff_a) + abs(diff_b))
-                    cross = spots_arr[i] + frac * (spots_arr[i + 1] - spots_arr[i])
-                    crossings.append(float(cross))
-            return sorted(crossings)
-
-        be_crossings = find_crossings(sweep_pnls, sweep_spots, 0)
-        tp_crossings = find_crossings(sweep_pnls, sweep_spots, take_profit_val)
-        ml_crossings = find_crossings(sweep_pnls, sweep_spots, ml_threshold)
+        # Croisements BE / TP / ML sur la courbe P&L calculée en section 4b
+        be_crossings, tp_crossings, ml_crossings = levels["be"], levels["tp"], levels["ml"]
 
         # Déterminer les zones du y-axis
         y_min_zone = float(sweep_spots[0])
@@ -1436,58 +1664,55 @@ try:
 
         if len(be_crossings) == 0:
             is_positive = sweep_pnls[len(sweep_pnls) // 2] > 0
-            fig.add_hrect(y0=y_min_zone, y1=y_max_zone,
-                fillcolor=GREEN_LIGHT if is_positive else RED_LIGHT, line_width=0, layer="below")
+            _hrect(y_min_zone, y_max_zone, GREEN_LIGHT if is_positive else RED_LIGHT)
         elif len(be_crossings) == 1:
             # 1 BE = stratégie directionnelle
             be = be_crossings[0]
-            pnl_above = simulate_pnl(strat_legs, be + 1, 21, current_sigma, qty_prob)
+            pnl_above = simulate_pnl(strat_soa, be + 1, 21, current_sigma, qty_prob)
             profit_above = pnl_above > 0
 
             if profit_above:
-                fig.add_hrect(y0=be, y1=y_max_zone, fillcolor=GREEN_LIGHT, line_width=0, layer="below")
-                fig.add_hrect(y0=y_min_zone, y1=be, fillcolor=RED_LIGHT, line_width=0, layer="below")
+                _hrect(be, y_max_zone, GREEN_LIGHT)
+                _hrect(y_min_zone, be, RED_LIGHT)
                 # TP dark green above TP spot
                 if tp_crossings:
-                    fig.add_hrect(y0=tp_crossings[-1], y1=y_max_zone, fillcolor=GREEN_DARK, line_width=0, layer="below")
+                    _hrect(tp_crossings[-1], y_max_zone, GREEN_DARK)
                 # ML dark red below ML spot
                 if ml_crossings:
-                    fig.add_hrect(y0=y_min_zone, y1=ml_crossings[0], fillcolor=RED_DARK, line_width=0, layer="below")
+                    _hrect(y_min_zone, ml_crossings[0], RED_DARK)
             else:
-                fig.add_hrect(y0=y_min_zone, y1=be, fillcolor=GREEN_LIGHT, line_width=0, layer="below")
-                fig.add_hrect(y0=be, y1=y_max_zone, fillcolor=RED_LIGHT, line_width=0, layer="below")
+                _hrect(y_min_zone, be, GREEN_LIGHT)
+                _hrect(be, y_max_zone, RED_LIGHT)
                 # TP dark green below TP spot
                 if tp_crossings:
-                    fig.add_hrect(y0=y_min_zone, y1=tp_crossings[0], fillcolor=GREEN_DARK, line_width=0, layer="below")
+                    _hrect(y_min_zone, tp_crossings[0], GREEN_DARK)
                 # ML dark red above ML spot
                 if ml_crossings:
-                    fig.add_hrect(y0=ml_crossings[-1], y1=y_max_zone, fillcolor=RED_DARK, line_width=0, layer="below")
+                    _hrect(ml_crossings[-1], y_max_zone, RED_DARK)
 
 
             # TP line
-            fig.add_hline(y=spot_tp, line_dash="dash", line_color="#34D399", line_width=1,
-                annotation_text=f"TP ${spot_tp:.0f}", annotation_position="right",
-                annotation_font_color="#34D399", annotation_font_size=11)
+            _hline(spot_tp, "#34D399", "dash", f"TP ${spot_tp:.0f}")
         else:
             # 2+ BE = Iron Condor
-            be_sorted = sorted(be_crossings)
-            center = (be_sorted[0] + be_sorted[-1]) / 2
-            pnl_center = simulate_pnl(strat_legs, center, 21, current_sigma, qty_prob)
+            # be_crossings est déjà trié par spot croissant (_crossings)
+            center = (be_crossings[0] + be_crossings[-1]) / 2
+            pnl_center = simulate_pnl(strat_soa, center, 21, current_sigma, qty_prob)
             center_positive = pnl_center > 0
 
             if center_positive:
-                fig.add_hrect(y0=y_min_zone, y1=be_sorted[0], fillcolor=RED_LIGHT, line_width=0, layer="below")
-                fig.add_hrect(y0=be_sorted[0], y1=be_sorted[-1], fillcolor=GREEN_LIGHT, line_width=0, layer="below")
-                fig.add_hrect(y0=be_sorted[-1], y1=y_max_zone, fillcolor=RED_LIGHT, line_width=0, layer="below")
+                _hrect(y_min_zone, be_crossings[0], RED_LIGHT)
+                _hrect(be_crossings[0], be_crossings[-1], GREEN_LIGHT)
+                _hrect(be_crossings[-1], y_max_zone, RED_LIGHT)
                 # ML dark red at extremes
                 if ml_crossings:
-                    fig.add_hrect(y0=y_min_zone, y1=ml_crossings[0], fillcolor=RED_DARK, line_width=0, layer="below")
+                    _hrect(y_min_zone, ml_crossings[0], RED_DARK)
                     if len(ml_crossings) >= 2:
-                        fig.add_hrect(y0=ml_crossings[-1], y1=y_max_zone, fillcolor=RED_DARK, line_width=0, layer="below")
+                        _hrect(ml_crossings[-1], y_max_zone, RED_DARK)
             else:
-                fig.add_hrect(y0=y_min_zone, y1=be_sorted[0], fillcolor=GREEN_LIGHT, line_width=0, layer="below")
-                fig.add_hrect(y0=be_sorted[0], y1=be_sorted[-1], fillcolor=RED_LIGHT, line_width=0, layer="below")
-                fig.add_hrect(y0=be_sorted[-1], y1=y_max_zone, fillcolor=GREEN_LIGHT, line_width=0, layer="below")
+                _hrect(y_min_zone, be_crossings[0], GREEN_LIGHT)
+                _hrect(be_crossings[0], be_crossings[-1], RED_LIGHT)
+                _hrect(be_crossings[-1], y_max_zone, GREEN_LIGHT)
 
 
 
@@ -1495,28 +1720,30 @@ try:
         dte_val = int(strategy["dte"])
         exit_date = dt.datetime.now() + dt.timedelta(days=max(1, dte_val - 21))
         exit_date_str = exit_date.strftime('%Y-%m-%d')
-        fig.add_shape(
+        shapes.append(dict(
             type="line",
             x0=exit_date_str, x1=exit_date_str,
             y0=0, y1=1, yref="paper",
             line=dict(color="#FBBF24", width=1, dash="dash"),
-        )
-        fig.add_annotation(
+        ))
+        annotations.append(dict(
             x=exit_date_str, y=1, yref="paper",
             text=f"Sortie {exit_date.strftime('%d/%m')}",
             showarrow=False, font=dict(color="#FBBF24", size=11),
             yshift=10,
-        )
+        ))
 
         # Y-axis range: padding autour du min/max prix
-        y_min = float(hist_data["Low"].min())
-        y_max = float(hist_data["High"].max())
+        y_min = low_6m
+        y_max = high_6m
         # Inclure les strikes, spot, BE, TP et projection dans le range
-        all_levels = [y_min, y_max] + strikes + [spot, spot_be, spot_tp] + list(future_prices)
-        y_range_min = min(all_levels) * 0.97
-        y_range_max = max(all_levels) * 1.03
+        all_levels = np.concatenate([[y_min, y_max, spot, spot_be, spot_tp], strikes, future_prices])
+        y_range_min = float(all_levels.min()) * 0.97
+        y_range_max = float(all_levels.max()) * 1.03
 
         fig.update_layout(
+            shapes=shapes,
+            annotations=annotations,
             height=400,
             margin=dict(l=0, r=80, t=10, b=0),
             paper_bgcolor="rgba(0,0,0,0)",
@@ -1543,11 +1770,9 @@ try:
         st.plotly_chart(fig, use_container_width=True)
 
         # Statistiques rapides
-        price_6m_ago = float(hist_data["Close"].iloc[0])
-        price_now = float(hist_data["Close"].iloc[-1])
+        price_6m_ago = float(close_np[0])
+        price_now = float(close_np[-1])
         change_pct = ((price_now - price_6m_ago) / price_6m_ago) * 100
-        high_6m = float(hist_data["High"].max())
-        low_6m = float(hist_data["Low"].min())
 
         st.caption(
             f"📊 **6 mois** : {change_pct:+.1f}% · "
@@ -1555,7 +1780,7 @@ try:
         )
       except Exception as _chart_err:
         st.error(f"Erreur chart : {_chart_err}")
-        st.code(_tb.format_exc())
+        st.code(traceback.format_exc())
 
     # ─── Section 4b : SIMULATION P&L À 21 DTE ───
     st.markdown("### 🔮 Simulation P&L à la Clôture (Time Stop à 21 DTE)")
@@ -1579,13 +1804,11 @@ try:
         ("+1.5 SD", "Forte Hausse", spot + 1.5 * sd_move),
     ]
 
-    sc1, sc2, sc3, sc4, sc5 = st.columns(5)
-    scenario_cols = [sc1, sc2, sc3, sc4, sc5]
-
-    for col, (sd_label, move_label, target_spot) in zip(scenario_cols, scenarios):
-        sim_pnl = simulate_pnl(
-            strategy["legs"], target_spot, 21, current_sigma, qty_sim
-        )
+    # Les 5 cartes sont émises en un seul bloc HTML (un seul élément Streamlit)
+    scenario_cards = []
+    scenario_pnls = simulate_pnl(strat_soa, np.array([sc[2] for sc in scenarios]),
+                                 21, current_sigma, qty_sim)
+    for (sd_label, move_label, target_spot), sim_pnl in zip(scenarios, scenario_pnls.tolist()):
 
         # Label dynamique basé sur le P&L
         if sim_pnl > take_profit_sim:
@@ -1612,8 +1835,7 @@ try:
         pct_sign = "+" if pct_change >= 0 else ""
         pct_color = "#34D399" if pct_change >= 0 else "#F87171"
 
-        with col:
-            st.markdown(f"""
+        scenario_cards.append(f"""
             <div class="greek-card" style="border-color: {pnl_border}; padding: 1.2rem 0.8rem;">
                 <div class="greek-symbol" style="color: #FBBF24; margin-bottom: 0.5rem;">{sd_label}</div>
                 <div style="font-family: 'Fira Code', monospace; font-size: 1.1rem; font-weight: 700; color: #F8FAFC; margin-bottom: 0.15rem;">${target_spot:,.2f}</div>
@@ -1621,8 +1843,9 @@ try:
                 <div style="font-size: 0.72rem; color: #94A3B8; margin-bottom: 0.6rem; font-family: 'Fira Sans', sans-serif;">{result_label}</div>
                 <div style="font-family: 'Fira Code', monospace; font-size: 1.25rem; font-weight: 700; color: {pnl_color};">{pnl_sign}${abs(sim_pnl):,.2f}</div>
             </div>
-            """, unsafe_allow_html=True)
+            """.strip())
 
+    st.markdown(f'<div class="card-row">{"".join(scenario_cards)}</div>', unsafe_allow_html=True)
     st.caption(f"📐 Écart-type estimé sur {holding_days}j : ±${sd_move:,.2f} (basé sur IV {current_sigma*100:.1f}%)")
 
     st.markdown("---")
@@ -1634,8 +1857,8 @@ try:
 
     # Estimer le prix du sous-jacent pour le take profit
     tp_target_spot = estimate_take_profit_spot(
-        strategy["legs"], spot, 21, current_sigma, qty_sim,
-        exit_plan["take_profit"]
+        strat_soa, spot, 21, current_sigma, qty_sim,
+        exit_plan["take_profit"], sweep=(sweep_spots, sweep_pnls),
     )
     if tp_target_spot is not None:
         tp_pct_change = ((tp_target_spot - spot) / spot) * 100
@@ -1668,10 +1891,8 @@ try:
 
 except ValueError as e:
     st.error(f"⚠️ **Erreur** : {e}")
-    import zoneinfo as _zi
     try:
-        _et = _zi.ZoneInfo("America/New_York")
-        _local_tz = dt.datetime.now().astimezone().tzinfo
+        _et, _local_tz = _market_zones()
         _open_local = dt.datetime.now(_et).replace(hour=9, minute=30).astimezone(_local_tz)
         _close_local = dt.datetime.now(_et).replace(hour=16, minute=0).astimezone(_local_tz)
         _hours = f"{_open_local.strftime('%Hh%M')}-{_close_local.strftime('%Hh%M')} (heure locale)"
@@ -3,6 +3,8 @@ config.py — Constantes, tickers et mappings de volatilité
 ==========================================================
 """
 
+from types import MappingProxyType
+
 import pandas as pd
 
 # ──────────────────────────────────────────────
@@ -95,15 +97,14 @@ TICKER_GROUPS = {
     },
 }
 
-# ── Lookup tables construits à partir des groupes ──
-TICKER_LIST = []
-TICKER_NAMES = {}
-TICKER_CATEGORY = {}
-for _cat, _tickers in TICKER_GROUPS.items():
-    for _t, _name in _tickers.items():
-        TICKER_LIST.append(_t)
-        TICKER_NAMES[_t] = _name
-        TICKER_CATEGORY[_t] = _cat
+# ── Lookup tables construits à partir des groupes (vues immuables) ──
+TICKER_NAMES = MappingProxyType(
+    {t: name for tickers in TICKER_GROUPS.values() for t, name in tickers.items()}
+)
+TICKER_CATEGORY = MappingProxyType(
+    {t: cat for cat, tickers in TICKER_GROUPS.items() for t in tickers}
+)
+TICKER_LIST = tuple(TICKER_NAMES)
 
 
 # ── Mapping ticker → indice de volatilité CBOE spécifique ──
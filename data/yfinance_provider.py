@@ -7,19 +7,181 @@ Source de données gratuite — utilisée par défaut.
 from __future__ import annotations
 
 import datetime as dt
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+import pandas as pd
 import yfinance as yf
 
 from config import VOL_INDEX_MAP
 from data.provider import DataProvider
 
 
+@functools.lru_cache(maxsize=256)
+def cached_ticker(symbol: str) -> yf.Ticker:
+    """
+    Objet yf.Ticker réutilisé par symbole, pour les appels .history() uniquement
+    (jamais mis en cache par yfinance). Les expirations d'options passent par
+    `_expirations` (Ticker renouvelé au TTL) et le calendrier garde un Ticker neuf.
+    """
+    return yf.Ticker(symbol)
+
+
+# Cache disque des téléchargements groupés : survit aux redémarrages du serveur
+# Streamlit (le cache st.cache_data est propre au processus).
+HISTORY_CACHE_DIR = Path.home() / ".cache" / "robo"
+
+
+def download_history(symbols: list[str], period: str = "1y", ttl: int = 300) -> pd.DataFrame:
+    """
+    yf.download groupé (group_by="ticker", auto_adjust) avec cache parquet.
+    Clé = (symboles, période, date du jour) ; un fichier plus récent que
+    `ttl` secondes est relu sans appel réseau. Les fichiers des jours
+    précédents sont purgés à l'écriture. Toute erreur disque (pyarrow
+    absent, répertoire en lecture seule) retombe sur le téléchargement direct.
+    """
+    today = dt.date.today().isoformat()
+    key = hashlib.sha1(f"{','.join(symbols)}|{period}".encode()).hexdigest()[:16]
+    path = HISTORY_CACHE_DIR / f"{key}_{today}.parquet"
+    try:
+        if time.time() - path.stat().st_mtime < ttl:
+            return pd.read_parquet(path)
+    except Exception:
+        pass
+
+    data = yf.download(symbols, period=period, group_by="ticker",
+                       auto_adjust=True, threads=True, progress=False)
+    if not data.empty:
+        try:
+            HISTORY_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            for stale in HISTORY_CACHE_DIR.glob("*.parquet"):
+                if not stale.name.endswith(f"_{today}.parquet"):
+                    stale.unlink(missing_ok=True)
+            data.to_parquet(path)
+        except Exception:
+            pass
+    return data
+
+
+# Caches mémoire du module : le scanner appelle le provider depuis 16 threads,
+# toute lecture / écriture passe par ce verrou (voir _cache_store).
+_cache_lock = threading.Lock()
+
+# Expirations parsées par ticker pendant `_EXPIRY_TTL` secondes :
+# get_options_chain puis get_leaps_chain / get_short_term_chain partagent un
+# seul yf.Ticker, un seul appel .options et un seul parsing des dates.
+# Au plus `_EXPIRY_MAX` tickers (comme cached_ticker).
+_EXPIRY_TTL = 300
+_EXPIRY_MAX = 256
+_expiry_cache: OrderedDict[str, tuple[float, yf.Ticker, list[tuple[int, str]]]] = OrderedDict()
+
+# Chaînes (cotations) : le cache mémoire est celui de l'app (st.cache_resource,
+# TTL 30 s). Ce module n'ajoute qu'un cache disque (parquet, clé datée du
+# jour) pour les redémarrages du serveur : seuls les fichiers écrits avant le
+# démarrage du processus et âgés de moins de `_CHAIN_DISK_TTL` secondes sont
+# relus — les cotations intraday restent fraîches.
+_CHAIN_DISK_TTL = 300
+CHAIN_CACHE_DIR = HISTORY_CACHE_DIR / "chains"
+_PROCESS_START = time.time()
+
+
+def _cache_store(cache: OrderedDict, key, entry: tuple, ttl: float, max_entries: int) -> None:
+    """
+    Insère `entry` (horodatage en entry[0]) sous le verrou, puis purge les
+    entrées expirées et, au-delà de `max_entries`, les plus anciennes.
+    """
+    with _cache_lock:
+        cache[key] = entry
+        cache.move_to_end(key)
+        now = time.time()
+        for stale in [k for k, e in cache.items() if now - e[0] >= ttl]:
+            del cache[stale]
+        while len(cache) > max_entries:
+            cache.popitem(last=False)
+
+
+def _expirations(ticker: str) -> tuple[yf.Ticker, list[tuple[int, str]]]:
+    """
+    Retourne (Ticker, [(dte, exp_str), ...]) pour `ticker`. Le Ticker est
+    recréé à l'expiration du TTL, ce qui rafraîchit aussi la liste des
+    expirations mémorisée par yfinance.
+    """
+    now = time.time()
+    with _cache_lock:
+        entry = _expiry_cache.get(ticker)
+    if entry is not None and now - entry[0] < _EXPIRY_TTL:
+        return entry[1], entry[2]
+
+    tk = yf.Ticker(ticker)
+    today = dt.date.today()
+    parsed = [
+        ((dt.date.fromisoformat(exp_str) - today).days, exp_str)
+        for exp_str in (tk.options or ())
+    ]
+    if parsed:  # une réponse vide (erreur réseau) n'est pas mémorisée
+        _cache_store(_expiry_cache, ticker, (now, tk, parsed), _EXPIRY_TTL, _EXPIRY_MAX)
+    return tk, parsed
+
+
+def _chain_paths(ticker: str, exp_str: str) -> tuple[Path, Path]:
+    """Fichiers parquet (calls, puts) du jour pour (ticker, expiration)."""
+    key = hashlib.sha1(f"{ticker}|{exp_str}".encode()).hexdigest()[:16]
+    stem = f"{key}_{dt.date.today().isoformat()}"
+    return CHAIN_CACHE_DIR / f"{stem}_calls.parquet", CHAIN_CACHE_DIR / f"{stem}_puts.parquet"
+
+
+def _option_chain(tk: yf.Ticker, ticker: str, exp_str: str) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    tk.option_chain(exp_str) → (calls, puts), relu du cache disque s'il date
+    d'avant le démarrage du processus. Toute erreur disque retombe sur
+    l'appel réseau, comme download_history.
+    """
+    calls_path, puts_path = _chain_paths(ticker, exp_str)
+    try:
+        written = min(calls_path.stat().st_mtime, puts_path.stat().st_mtime)
+        if written < _PROCESS_START and time.time() - written < _CHAIN_DISK_TTL:
+            return pd.read_parquet(calls_path), pd.read_parquet(puts_path)
+    except Exception:
+        pass
+
+    chain = tk.option_chain(exp_str)
+    try:
+        CHAIN_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        today = dt.date.today().isoformat()
+        for stale in CHAIN_CACHE_DIR.glob("*.parquet"):
+            if f"_{today}_" not in stale.name:
+                stale.unlink(missing_ok=True)
+        chain.calls.to_parquet(calls_path)
+        chain.puts.to_parquet(puts_path)
+    except Exception:
+        pass
+    return chain.calls, chain.puts
+
+
+def _chain_for(ticker: str, candidates: list[tuple[int, str]], target: int):
+    """
+    Choisit l'expiration de `candidates` la plus proche de `target` jours
+    (la première en cas d'égalité) et retourne
+    (expiration_date_str, calls_df, puts_df, dte) ; None si aucun candidat.
+    """
+    if not candidates:
+        return None
+    tk, _ = _expirations(ticker)
+    best_dte, best_exp = min(candidates, key=lambda c: abs(c[0] - target))
+    calls, puts = _option_chain(tk, ticker, best_exp)
+    return best_exp, calls, puts, best_dte
+
+
 class YFinanceProvider(DataProvider):
     """Fournisseur de données via l'API Yahoo Finance (gratuit, delayed)."""
 
     def get_spot_price(self, ticker: str) -> float:
         """Récupère le prix actuel (Spot) du ticker."""
-        tk = yf.Ticker(ticker)
-        hist = tk.history(period="1d")
+        hist = cached_ticker(ticker).history(period="1d")
         if hist.empty:
             raise ValueError(f"Aucune donnée trouvée pour le ticker « {ticker} ».")
         return float(hist["Close"].iloc[-1])
@@ -33,15 +195,13 @@ class YFinanceProvider(DataProvider):
         vol_symbol = VOL_INDEX_MAP.get(ticker, "^VIX")
 
         # Essai avec l'indice spécifique
-        tk = yf.Ticker(vol_symbol)
-        hist = tk.history(period="5d")
+        hist = cached_ticker(vol_symbol).history(period="5d")
         if not hist.empty:
             return float(hist["Close"].iloc[-1]), vol_symbol
 
         # Fallback vers VIX si l'indice spécifique échoue
         if vol_symbol != "^VIX":
-            tk = yf.Ticker("^VIX")
-            hist = tk.history(period="5d")
+            hist = cached_ticker("^VIX").history(period="5d")
             if not hist.empty:
                 return float(hist["Close"].iloc[-1]), "^VIX"
 
@@ -53,42 +213,16 @@ class YFinanceProvider(DataProvider):
         de target_dte (fourchette 35-60 jours).
         Retourne (expiration_date_str, calls_df, puts_df, dte).
         """
-        tk = yf.Ticker(ticker)
-        expirations = tk.options
+        _, expirations = _expirations(ticker)
         if not expirations:
             raise ValueError(f"Aucune chaîne d'options disponible pour « {ticker} ».")
 
-        today = dt.date.today()
-        best_exp = None
-        best_dte = None
-        best_diff = float("inf")
-
-        for exp_str in expirations:
-            exp_date = dt.datetime.strptime(exp_str, "%Y-%m-%d").date()
-            dte = (exp_date - today).days
-            diff = abs(dte - target_dte)
-            if 35 <= dte <= 60 and diff < best_diff:
-                best_diff = diff
-                best_exp = exp_str
-                best_dte = dte
-
         # Si rien dans [35,60], prend l'expiration la plus proche de target_dte
-        if best_exp is None:
-            for exp_str in expirations:
-                exp_date = dt.datetime.strptime(exp_str, "%Y-%m-%d").date()
-                dte = (exp_date - today).days
-                if dte > 0:
-                    diff = abs(dte - target_dte)
-                    if diff < best_diff:
-                        best_diff = diff
-                        best_exp = exp_str
-                        best_dte = dte
-
-        if best_exp is None:
+        result = (_chain_for(ticker, [e for e in expirations if 35 <= e[0] <= 60], target_dte)
+                  or _chain_for(ticker, [e for e in expirations if e[0] > 0], target_dte))
+        if result is None:
             raise ValueError("Aucune expiration d'options valide trouvée.")
-
-        chain = tk.option_chain(best_exp)
-        return best_exp, chain.calls, chain.puts, best_dte
+        return result
 
     def get_leaps_chain(self, ticker: str):
         """
@@ -96,53 +230,14 @@ class YFinanceProvider(DataProvider):
         d'achat de temps (PMCC).
         Retourne (expiration_date_str, calls_df, puts_df, dte) ou None.
         """
-        tk = yf.Ticker(ticker)
-        expirations = tk.options
-        today = dt.date.today()
-        best_exp = None
-        best_dte = None
-        best_diff = float("inf")
-
-        for exp_str in expirations:
-            exp_date = dt.datetime.strptime(exp_str, "%Y-%m-%d").date()
-            dte = (exp_date - today).days
-            if dte > 200:
-                diff = abs(dte - 365)  # cible ~1 an
-                if diff < best_diff:
-                    best_diff = diff
-                    best_exp = exp_str
-                    best_dte = dte
-
-        if best_exp is None:
-            return None
-
-        chain = tk.option_chain(best_exp)
-        return best_exp, chain.calls, chain.puts, best_dte
+        _, expirations = _expirations(ticker)
+        # cible ~1 an
+        return _chain_for(ticker, [e for e in expirations if e[0] > 200], 365)
 
     def get_short_term_chain(self, ticker: str):
         """
         Récupère la chaîne d'options court terme (~20 DTE)
         pour les Calendar Spreads.
         """
-        tk = yf.Ticker(ticker)
-        expirations = tk.options
-        today = dt.date.today()
-        best_exp = None
-        best_dte = None
-        best_diff = float("inf")
-
-        for exp_str in expirations:
-            exp_date = dt.datetime.strptime(exp_str, "%Y-%m-%d").date()
-            dte = (exp_date - today).days
-            if dte > 5:
-                diff = abs(dte - 20)
-                if diff < best_diff:
-                    best_diff = diff
-                    best_exp = exp_str
-                    best_dte = dte
-
-        if best_exp is None:
-            return None
-
-        chain = tk.option_chain(best_exp)
-        return best_exp, chain.calls, chain.puts, best_dte
+        _, expirations = _expirations(ticker)
+        return _chain_for(ticker, [e for e in expirations if e[0] > 5], 20)
@@ -6,16 +6,103 @@ Fonctions pures : aucune dépendance Streamlit ni data provider.
 
 from __future__ import annotations
 
+import functools
+import math
 import numpy as np
-from scipy.stats import norm
+from scipy.optimize import brentq
+from scipy.special import ndtr
 
 from config import RISK_FREE_RATE
+from engine.jit import njit, vectorize
 
 
 # ──────────────────────────────────────────────
 # Greeks
 # ──────────────────────────────────────────────
 
+_INV_SQRT2 = 0.7071067811865476        # 1/√2
+_INV_SQRT_2PI = 0.3989422804014327     # 1/√(2π)
+
+
+# Fonction de répartition normale unique du module (formules scalaires et noyaux)
+@njit(cache=True)
+def _norm_cdf(x: float) -> float:
+    """N(x) via erfc (précis dans les deux queues, compatible Numba)."""
+    return 0.5 * math.erfc(-x * _INV_SQRT2)
+
+
+@njit(cache=True)
+def _norm_pdf(x: float) -> float:
+    """Densité normale standard φ(x) (compatible Numba)."""
+    return _INV_SQRT_2PI * math.exp(-0.5 * x * x)
+
+
+# Noyaux scalaires compilés : flottants uniquement, T > 0 et sigma > 0 garantis
+# par les fonctions publiques ci-dessous (is_call remplace option_type).
+@njit(cache=True)
+def _d1_d2(S: float, K: float, T: float, r: float, sigma: float):
+    """Sous-expressions communes : (d1, d2, √T, K·e^(-rT))."""
+    sqrt_t = math.sqrt(T)
+    d1 = (math.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    return d1, d1 - sigma * sqrt_t, sqrt_t, K * math.exp(-r * T)
+
+
+@njit(cache=True)
+def _bs_delta_core(S: float, K: float, T: float, r: float, sigma: float,
+                   is_call: bool) -> float:
+    d1, _, _, _ = _d1_d2(S, K, T, r, sigma)
+    return _norm_cdf(d1) if is_call else _norm_cdf(d1) - 1.0
+
+
+@njit(cache=True)
+def _bs_price_core(S: float, K: float, T: float, r: float, sigma: float,
+                   is_call: bool) -> float:
+    d1, d2, _, disc_k = _d1_d2(S, K, T, r, sigma)
+    if is_call:
+        return S * _norm_cdf(d1) - disc_k * _norm_cdf(d2)
+    return disc_k * _norm_cdf(-d2) - S * _norm_cdf(-d1)
+
+
+@njit(cache=True)
+def _bs_gamma_core(S: float, K: float, T: float, r: float, sigma: float) -> float:
+    d1, _, sqrt_t, _ = _d1_d2(S, K, T, r, sigma)
+    return _norm_pdf(d1) / (S * sigma * sqrt_t)
+
+
+@njit(cache=True)
+def _bs_theta_core(S: float, K: float, T: float, r: float, sigma: float,
+                   is_call: bool) -> float:
+    d1, d2, sqrt_t, disc_k = _d1_d2(S, K, T, r, sigma)
+    common = -(S * _norm_pdf(d1) * sigma) / (2 * sqrt_t)
+    if is_call:
+        theta = common - r * disc_k * _norm_cdf(d2)
+    else:
+        theta = common + r * disc_k * _norm_cdf(-d2)
+    return theta / 365  # par jour
+
+
+@njit(cache=True)
+def _bs_vega_core(S: float, K: float, T: float, r: float, sigma: float) -> float:
+    d1, _, sqrt_t, _ = _d1_d2(S, K, T, r, sigma)
+    return S * _norm_pdf(d1) * sqrt_t / 100  # pour 1%
+
+
+@njit(cache=True)
+def _bs_greeks_core(S: float, K: float, T: float, r: float, sigma: float,
+                    is_call: bool):
+    """(delta, gamma, theta, vega) d'un leg long avec un seul calcul de d1/d2."""
+    d1, d2, sqrt_t, disc_k = _d1_d2(S, K, T, r, sigma)
+    pdf_d1 = _norm_pdf(d1)
+    if is_call:
+        delta = _norm_cdf(d1)
+        carry = -r * disc_k * _norm_cdf(d2)
+    else:
+        delta = _norm_cdf(d1) - 1.0
+        carry = r * disc_k * _norm_cdf(-d2)
+    theta = (-(S * pdf_d1 * sigma) / (2 * sqrt_t) + carry) / 365
+    return delta, pdf_d1 / (S * sigma * sqrt_t), theta, S * pdf_d1 * sqrt_t / 100
+
+
 def black_scholes_delta(S: float, K: float, T: float, r: float,
                         sigma: float, option_type: str) -> float:
     """
@@ -25,11 +112,8 @@ def black_scholes_delta(S: float, K: float, T: float, r: float,
     """
     if T <= 0 or sigma <= 0:
         return 0.0
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    if option_type == "call":
-        return float(norm.cdf(d1))
-    else:
-        return float(norm.cdf(d1) - 1)
+    return float(_bs_delta_core(float(S), float(K), float(T), float(r), float(sigma),
+                                option_type == "call"))
 
 
 def black_scholes_price(S: float, K: float, T: float, r: float,
@@ -37,20 +121,15 @@ def black_scholes_price(S: float, K: float, T: float, r: float,
     """Prix théorique Black-Scholes d'une option européenne."""
     if T <= 0 or sigma <= 0:
         return max(0, (S - K) if option_type == "call" else (K - S))
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    if option_type == "call":
-        return float(S * norm.cdf(d1) - K * np.exp(-r * T) * norm.cdf(d2))
-    else:
-        return float(K * np.exp(-r * T) * norm.cdf(-d2) - S * norm.cdf(-d1))
+    return float(_bs_price_core(float(S), float(K), float(T), float(r), float(sigma),
+                                option_type == "call"))
 
 
 def black_scholes_gamma(S: float, K: float, T: float, r: float, sigma: float) -> float:
     """Gamma : taux de variation du Delta par rapport au sous-jacent."""
     if T <= 0 or sigma <= 0:
         return 0.0
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    return float(norm.pdf(d1) / (S * sigma * np.sqrt(T)))
+    return float(_bs_gamma_core(float(S), float(K), float(T), float(r), float(sigma)))
 
 
 def black_scholes_theta(S: float, K: float, T: float, r: float,
@@ -58,124 +137,444 @@ def black_scholes_theta(S: float, K: float, T: float, r: float,
     """Theta : déclin temporel journalier (en $/jour pour 1 action)."""
     if T <= 0 or sigma <= 0:
         return 0.0
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    d2 = d1 - sigma * np.sqrt(T)
-    common = -(S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T))
-    if option_type == "call":
-        theta = common - r * K * np.exp(-r * T) * norm.cdf(d2)
-    else:
-        theta = common + r * K * np.exp(-r * T) * norm.cdf(-d2)
-    return float(theta / 365)  # par jour
+    return float(_bs_theta_core(float(S), float(K), float(T), float(r), float(sigma),
+                                option_type == "call"))
 
 
 def black_scholes_vega(S: float, K: float, T: float, r: float, sigma: float) -> float:
     """Vega : sensibilité à la volatilité (pour 1% de changement d'IV)."""
     if T <= 0 or sigma <= 0:
         return 0.0
-    d1 = (np.log(S / K) + (r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
-    return float(S * norm.pdf(d1) * np.sqrt(T) / 100)  # pour 1%
+    return float(_bs_vega_core(float(S), float(K), float(T), float(r), float(sigma)))
 
 
 # ──────────────────────────────────────────────
 # Leg Greeks & P&L
 # ──────────────────────────────────────────────
 
+def _greeks_arrays(S: float, K, T, sigma: float, is_call) -> dict[str, np.ndarray]:
+    """
+    Grecques d'options longues en formules fermées diffusées (broadcast) sur
+    K, T et is_call ; T > 0 et sigma > 0 requis (masqués par l'appelant).
+    """
+    r = float(RISK_FREE_RATE)
+    sqrt_t = np.sqrt(T)
+    d1 = (np.log(S / K) + (r + 0.5 * sigma * sigma) * T) / (sigma * sqrt_t)
+    d2 = d1 - sigma * sqrt_t
+    disc_k = K * np.exp(-r * T)
+    pdf_d1 = _INV_SQRT_2PI * np.exp(-0.5 * d1 * d1)
+    nd1 = ndtr(d1)
+    delta = np.where(is_call, nd1, nd1 - 1.0)
+    carry = np.where(is_call, -r * disc_k * ndtr(d2), r * disc_k * ndtr(-d2))
+    return {
+        "delta": delta,
+        "gamma": pdf_d1 / (S * sigma * sqrt_t),
+        "theta": (-(S * pdf_d1 * sigma) / (2 * sqrt_t) + carry) / 365,
+        "vega": S * pdf_d1 * sqrt_t / 100,
+    }
+
+
+# Ufunc Delta : un appel compilé pour tout un tableau de strikes (diffusion
+# NumPy sur tous les arguments), sans calculer les autres grecques
+@vectorize(["float64(float64, float64, float64, float64, float64, boolean)"], cache=True)
+def _bs_delta_ufunc(S, K, T, r, sigma, is_call):
+    return _bs_delta_core(S, K, T, r, sigma, is_call)
+
+
+def compute_delta_grid(S: float, K, T: float, sigma: float,
+                       option_type: str) -> np.ndarray:
+    """
+    Delta d'une option longue pour tout un vecteur de strikes K (sélection
+    de strike par delta). Même convention que black_scholes_delta.
+    """
+    K = np.asarray(K, dtype=np.float64)
+    if T <= 0 or sigma <= 0:
+        return np.zeros_like(K)
+    return _bs_delta_ufunc(float(S), K, float(T), float(RISK_FREE_RATE), float(sigma),
+                           option_type == "call")
+
+
+def compute_greeks_grid(S: float, K, T: float, sigma: float,
+                        option_type: str) -> dict[str, np.ndarray]:
+    """
+    Grecques d'une option longue pour tout un vecteur de strikes K (chaîne,
+    candidats de sélection) : un seul passage NumPy / ndtr au lieu d'un appel
+    scalaire par strike. Retourne des tableaux {delta, gamma, theta, vega}
+    de même forme que K, avec les conventions de black_scholes_*.
+    """
+    K = np.asarray(K, dtype=np.float64)
+    if T <= 0 or sigma <= 0:
+        return {name: np.zeros_like(K) for name in ("delta", "gamma", "theta", "vega")}
+    return _greeks_arrays(S, K, T, sigma, option_type == "call")
+
+
+def compute_strategy_greeks(legs_soa: dict[str, np.ndarray], S: float,
+                            sigma: float) -> dict[str, np.ndarray]:
+    """
+    Grecques signées (BUY = +1, SELL = -1) de tous les legs d'une stratégie en
+    un seul passage vectorisé ; T propre à chaque leg (dte / 365). Les legs
+    expirés (ou sigma <= 0) valent 0. Grecques nettes = tableau.sum().
+    """
+    T = legs_soa["dte"] / 365.0
+    live = (T > 0) & (sigma > 0)
+    greeks = _greeks_arrays(S, legs_soa["strike"], np.where(live, T, 1.0),
+                            sigma if sigma > 0 else 1.0, legs_soa["is_call"])
+    weight = np.where(live, legs_soa["sign"], 0.0)
+    return {name: weight * values for name, values in greeks.items()}
+
+
+# Les reruns Streamlit recalculent les mêmes legs : mémo des grecques par
+# (S, K, T, sigma, type), entrées arrondies à 6 décimales pour stabiliser la clé.
+@functools.lru_cache(maxsize=4096)
+def _greeks_memo(S: float, K: float, T: float, sigma: float, is_call: bool) -> tuple:
+    return _bs_greeks_core(S, K, T, float(RISK_FREE_RATE), sigma, is_call)
+
+
+def leg_greeks_vector(leg: dict, S: float, T: float, sigma: float) -> np.ndarray:
+    """
+    Grecques d'un leg pour une position longue, sans signe ni arrondi :
+    vecteur (4,) [delta, gamma, theta, vega]. Les vecteurs de plusieurs legs
+    s'empilent en une matrice (n_legs, 4) agrégée par un produit signes @ G.
+    """
+    if T <= 0 or sigma <= 0:
+        return np.zeros(4)
+    return np.array(_greeks_memo(round(float(S), 6), round(float(leg["strike"]), 6),
+                                 round(float(T), 6), round(float(sigma), 6),
+                                 leg["type"].lower() == "call"))
+
+
 def compute_leg_greeks(leg: dict, S: float, T: float, sigma: float) -> dict:
     """Calcule Delta, Gamma, Theta, Vega et IV pour un leg de la stratégie."""
-    K = leg["strike"]
-    opt_type = leg["type"].lower()
     sign = 1 if leg["action"] == "BUY" else -1
-
-    delta = black_scholes_delta(S, K, T, RISK_FREE_RATE, sigma, opt_type) * sign
-    gamma = black_scholes_gamma(S, K, T, RISK_FREE_RATE, sigma) * sign
-    theta = black_scholes_theta(S, K, T, RISK_FREE_RATE, sigma, opt_type) * sign
-    vega = black_scholes_vega(S, K, T, RISK_FREE_RATE, sigma) * sign
+    delta, gamma, theta, vega = leg_greeks_vector(leg, S, T, sigma) * sign
 
     return {
-        "delta": round(delta, 4),
-        "gamma": round(gamma, 4),
-        "theta": round(theta, 4),
-        "vega": round(vega, 4),
+        "delta": round(float(delta), 4),
+        "gamma": round(float(gamma), 4),
+        "theta": round(float(theta), 4),
+        "vega": round(float(vega), 4),
         "iv": round(sigma * 100, 1),
     }
 
 
-def simulate_pnl(legs: list, target_spot: float, days_to_target: int,
-                 current_sigma: float, qty: int) -> float:
+@njit(cache=True)
+def _position_value_log_core(S: np.ndarray, log_s: np.ndarray, K: np.ndarray,
+                             is_call: np.ndarray, signs: np.ndarray, T: float,
+                             r: float, sigma: float) -> np.ndarray:
+    """
+    Valeur théorique nette Σ signe × prix BS de la position pour chaque spot de S
+    (une seule passe spots × legs, sans tableaux intermédiaires).
+    log_s = ln S, fourni par l'appelant quand il le connaît déjà.
+    """
+    out = np.zeros(S.shape[0])
+    # sigma <= 0 : valeur intrinsèque, testé une fois hors des boucles
+    if sigma <= 0:
+        for j in range(K.shape[0]):
+            k = K[j]
+            for i in range(S.shape[0]):
+                price = max(S[i] - k, 0.0) if is_call[j] else max(k - S[i], 0.0)
+                out[i] += signs[j] * price
+        return out
+
+    # Invariants : (r + σ²/2)T - ln K, σ√T et K·e^(-rT) une fois par leg
+    # → ln(S/K) n'est plus recalculé pour chaque couple
+    sqrt_t = math.sqrt(T)
+    drift = (r + 0.5 * sigma * sigma) * T
+    vol_t = sigma * sqrt_t
+    disc = math.exp(-r * T)
+    for j in range(K.shape[0]):
+        k = K[j]
+        disc_k = k * disc
+        shift = drift - math.log(k)
+        for i in range(S.shape[0]):
+            s = S[i]
+            d1 = (log_s[i] + shift) / vol_t
+            d2 = d1 - vol_t
+            if is_call[j]:
+                price = s * _norm_cdf(d1) - disc_k * _norm_cdf(d2)
+            else:
+                price = disc_k * _norm_cdf(-d2) - s * _norm_cdf(-d1)
+            out[i] += signs[j] * price
+    return out
+
+
+@njit(cache=True)
+def _position_value_core(S: np.ndarray, K: np.ndarray, is_call: np.ndarray,
+                         signs: np.ndarray, T: float, r: float,
+                         sigma: float) -> np.ndarray:
+    """_position_value_log_core avec ln S calculé une fois par spot."""
+    return _position_value_log_core(S, np.log(S), K, is_call, signs, T, r, sigma)
+
+
+def legs_to_soa(legs: list) -> dict[str, np.ndarray]:
+    """
+    Legs (liste de dicts) → structure de tableaux, une entrée par leg :
+    strike, price (prix d'entrée), sign (BUY = +1, SELL = -1), is_call, dte.
+    À construire une fois par stratégie : make_pnl_fn, simulate_pnl,
+    estimate_take_profit_spot et compute_real_probabilities l'acceptent
+    à la place de la liste.
+    """
+    return {
+        "strike": np.array([leg["strike"] for leg in legs], dtype=np.float64),
+        "price": np.array([leg["price"] for leg in legs], dtype=np.float64),
+        "sign": np.array([1.0 if leg["action"] == "BUY" else -1.0 for leg in legs]),
+        "is_call": np.array([leg["type"].lower() == "call" for leg in legs], dtype=bool),
+        "dte": np.array([leg.get("dte", 0) for leg in legs], dtype=np.float64),
+    }
+
+
+def make_pnl_fn(legs: list | dict, days_to_target: int, current_sigma: float, qty: int):
+    """
+    Spécialise simulate_pnl pour une position figée : les vecteurs des legs,
+    la valeur d'ouverture et T sont calculés une fois, la fonction retournée
+    n'évalue plus que le spot (scalaire → float, tableau → tableau).
+    legs : liste de dicts ou structure de tableaux issue de legs_to_soa.
+    """
+    T_target = max(days_to_target, 1) / 365.0
+    r = float(RISK_FREE_RATE)
+    sigma = float(current_sigma)
+
+    # Paramètres des legs empilés en vecteurs (BUY = +1, SELL = -1)
+    soa = legs if isinstance(legs, dict) else legs_to_soa(legs)
+    K, is_call, signs = soa["strike"], soa["is_call"], soa["sign"]
+
+    # Valeur initiale nette (coût d'ouverture)
+    initial_value = soa["price"] @ signs
+
+    def pnl_at(target_spot):
+        # Nouvelle valeur théorique au target_spot et T_target
+        S = np.asarray(target_spot, dtype=np.float64)
+        new_value = _position_value_core(S.ravel(), K, is_call, signs, T_target, r, sigma)
+        pnl = (new_value - initial_value) * 100 * qty
+        if S.ndim == 0:
+            return round(float(pnl[0]), 2)
+        return np.round(pnl, 2).reshape(S.shape)
+
+    return pnl_at
+
+
+def simulate_pnl(legs: list | dict, target_spot, days_to_target: int,
+                 current_sigma: float, qty: int):
     """
     Simule le P&L théorique de la position à un prix cible et une date cible.
     Utilise Black-Scholes pour recalculer le prix de chaque leg.
     Retourne le P&L en $ (positif = profit, négatif = perte).
+
+    target_spot peut être un scalaire (retourne un float) ou un tableau NumPy
+    de spots : toute la courbe est alors évaluée en un seul passage (noyau
+    Numba si disponible) et un tableau de P&L est retourné. Pour des appels
+    répétés sur la même position, préférer make_pnl_fn.
     """
-    T_target = max(days_to_target, 1) / 365.0
+    return make_pnl_fn(legs, days_to_target, current_sigma, qty)(target_spot)
 
-    # Valeur initiale nette (coût d'ouverture)
-    initial_value = 0.0
-    for leg in legs:
-        sign = 1 if leg["action"] == "BUY" else -1
-        initial_value += sign * leg["price"]
-
-    # Nouvelle valeur théorique au target_spot et T_target
-    new_value = 0.0
-    for leg in legs:
-        opt_type = leg["type"].lower()
-        K = leg["strike"]
-        sign = 1 if leg["action"] == "BUY" else -1
-        new_price = black_scholes_price(target_spot, K, T_target,
-                                        RISK_FREE_RATE, current_sigma, opt_type)
-        new_value += sign * new_price
-
-    pnl = (new_value - initial_value) * 100 * qty
-    return round(pnl, 2)
-
-
-def estimate_take_profit_spot(legs: list, spot: float, days_to_target: int,
+
+def estimate_take_profit_spot(legs: list | dict, spot: float, days_to_target: int,
                               current_sigma: float, qty: int,
-                              take_profit_pnl: float) -> float | None:
+                              take_profit_pnl: float,
+                              sweep: tuple[np.ndarray, np.ndarray] | None = None) -> float | None:
     """
     Estime le prix du sous-jacent nécessaire pour atteindre le Take Profit.
-    Utilise une recherche par balayage puis affinage (bisection).
-    Retourne le prix spot estimé ou None si introuvable.
-    """
-    # Chercher dans les deux directions (hausse et baisse)
-    best_spot = None
-    best_diff = float("inf")
-
-    # Balayage large : de -20% à +20% par pas de 0.1%
-    for pct in range(-200, 201):
-        test_spot = spot * (1 + pct / 1000.0)
-        pnl = simulate_pnl(legs, test_spot, days_to_target, current_sigma, qty)
-        diff = abs(pnl - take_profit_pnl)
-        if diff < best_diff:
-            best_diff = diff
-            best_spot = test_spot
-
-    # Affinage par bisection autour du meilleur candidat
-    if best_spot is not None:
-        lo = best_spot * 0.995
-        hi = best_spot * 1.005
-        for _ in range(30):
-            mid = (lo + hi) / 2
-            pnl_mid = simulate_pnl(legs, mid, days_to_target, current_sigma, qty)
-            if pnl_mid < take_profit_pnl:
-                # Besoin d'un spot qui rapproche du profit
-                pnl_lo = simulate_pnl(legs, lo, days_to_target, current_sigma, qty)
-                if pnl_lo < pnl_mid:
-                    lo = mid
-                else:
-                    hi = mid
-            else:
-                hi = mid
-        # Vérifier que le résultat est raisonnable (dans ±20%)
-        final_spot = (lo + hi) / 2
-        final_pnl = simulate_pnl(legs, final_spot, days_to_target, current_sigma, qty)
-        if abs(final_pnl - take_profit_pnl) < take_profit_pnl * 0.1 and abs(final_spot - spot) / spot < 0.25:
-            return round(final_spot, 2)
+    Encadre les changements de signe de P&L(S) - TP puis résout chaque
+    racine par la méthode de Brent ; retourne la plus proche du spot actuel
+    (ou None si introuvable).
 
+    sweep : courbe (spots, pnls) déjà évaluée avec les mêmes paramètres ;
+            ses points dans la fenêtre ±20 % (±25 % à défaut de croisement)
+            servent alors d'encadrements.
+    """
+    pnl_at = make_pnl_fn(legs, days_to_target, current_sigma, qty)
+
+    def gap(s: float) -> float:
+        return pnl_at(s) - take_profit_pnl
+
+    # Points d'encadrement : courbe existante ou spot -20% / spot / +20%
+    # (élargi à ±25 %, la tolérance historique, si aucun croisement n'y figure)
+    if sweep is not None:
+        spots_arr = np.asarray(sweep[0], dtype=np.float64)
+        pnls_arr = np.asarray(sweep[1], dtype=np.float64)
+        rel = np.abs(spots_arr / spot - 1)
+        in_window = np.flatnonzero(rel <= 0.2)
+        grid = spots_arr[in_window]
+        gaps = pnls_arr[in_window] - take_profit_pnl
+        # Aucun changement de signe : reprendre les points de la courbe jusqu'à ±25 %
+        if not np.any(gaps[:-1] * gaps[1:] <= 0):
+            in_window = np.flatnonzero(rel <= 0.25)
+            grid = spots_arr[in_window]
+            gaps = pnls_arr[in_window] - take_profit_pnl
+    else:
+        grid = spot * np.array([0.8, 1.0, 1.2])
+        gaps = pnl_at(grid) - take_profit_pnl
+        # Aucun changement de signe : élargir une fois l'encadrement jusqu'à ±25 %
+        if not np.any(gaps[:-1] * gaps[1:] <= 0):
+            outer = pnl_at(spot * np.array([0.75, 1.25])) - take_profit_pnl
+            grid = spot * np.array([0.75, 0.8, 1.0, 1.2, 1.25])
+            gaps = np.concatenate(([outer[0]], gaps, [outer[1]]))
+    if grid.size == 0:
+        return None
+
+    # Une racine de Brent par changement de signe (ou zéro exact) entre deux points
+    roots = []
+    for i in np.flatnonzero(gaps[:-1] * gaps[1:] <= 0):
+        try:
+            roots.append(brentq(gap, grid[i], grid[i + 1], xtol=spot * 1e-4, maxiter=50))
+        except (ValueError, RuntimeError):
+            continue
+    if roots:
+        return round(float(min(roots, key=lambda r: abs(r - spot))), 2)
+
+    # Pas de croisement : meilleur point s'il approche le TP à 10 % près
+    best = int(np.argmin(np.abs(gaps)))
+    if abs(gaps[best]) < take_profit_pnl * 0.1:
+        return round(float(grid[best]), 2)
     return None
 
 
-def compute_real_probabilities(legs: list, spot: float, dte: int,
+# Borne des racines en z (P(|Z| > 8) ≈ 1e-15)
+_Z_BOUND = 8.0
+
+# Quadrature de Gauss-Hermite (version probabiliste, poids e^(-z²/2)) :
+# ∫ f(z)·φ(z) dz ≈ Σ w_i · f(z_i), exacte jusqu'au degré 255. Nœuds croissants.
+_GH_Z, _GH_W = np.polynomial.hermite_e.hermegauss(128)
+_GH_W = _GH_W / math.sqrt(2 * math.pi)
+
+# Balayage uniforme des racines P&L = seuil (pas 0.016σ, même densité que
+# l'ancienne grille de 500 points sur ±4σ) : une zone de TP plus étroite que
+# l'écart entre deux nœuds de Gauss-Hermite (~0.28σ au centre) n'est pas
+# manquée. Au-delà de ±4σ (masse 6e-5), l'état aux bornes est prolongé.
+_Z_SCAN = np.linspace(-4.0, 4.0, 501)
+
+
+@njit(cache=True)
+def _pnl_at_z(z: float, log_spot: float, drift: float, vol: float,
+              K: np.ndarray, is_call: np.ndarray, signs: np.ndarray,
+              initial_value: float, qty: float, T: float, r: float,
+              sigma: float) -> float:
+    """P&L au time-stop pour S_T = spot · exp(drift + vol · z)."""
+    log_s = np.array([log_spot + drift + vol * z])
+    value = _position_value_log_core(np.exp(log_s), log_s, K, is_call, signs, T, r, sigma)[0]
+    return (value - initial_value) * 100 * qty
+
+
+@njit(cache=True)
+def _quadrature_pnl_core(log_spot: float, drift: float, vol: float, K: np.ndarray,
+                         is_call: np.ndarray, signs: np.ndarray,
+                         initial_value: float, qty: float, T: float, r: float,
+                         sigma: float, take_profit: float, ml_threshold: float):
+    """
+    (EV, P(P&L ≥ TP), P(P&L ≥ 0), P(P&L ≤ seuil de perte max)) pour une
+    position quelconque :
+
+    - EV : quadrature de Gauss-Hermite Σ w_i · P&L(z_i) (intégrande lisse) ;
+    - probabilités : les indicatrices P&L ≥ x ne se prêtent pas à la
+      quadrature, donc chaque changement de signe entre deux points voisins
+      de la grille uniforme _Z_SCAN est localisé par interpolation linéaire
+      et la probabilité est la somme exacte des masses Φ(b) - Φ(a) des
+      plages où P&L ≥ x.
+    """
+    log_s = log_spot + drift + vol * _GH_Z
+    values = _position_value_log_core(np.exp(log_s), log_s, K, is_call, signs, T, r, sigma)
+    pnl = (values - initial_value) * 100 * qty
+    ev = 0.0
+    for i in range(pnl.shape[0]):
+        ev += pnl[i] * _GH_W[i]
+
+    log_s = log_spot + drift + vol * _Z_SCAN
+    values = _position_value_log_core(np.exp(log_s), log_s, K, is_call, signs, T, r, sigma)
+    pnl = (values - initial_value) * 100 * qty
+
+    probs = np.empty(3)
+    thresholds = (take_profit, 0.0, ml_threshold)
+    for t in range(3):
+        x = thresholds[t]
+        p = 0.0
+        above = pnl[0] >= x
+        start = -math.inf  # début de la plage courante où P&L ≥ x
+        for i in range(1, pnl.shape[0]):
+            now = pnl[i] >= x
+            if now != above:
+                # Racine par interpolation linéaire dans l'intervalle (erreur
+                # O(pas²) sur un P&L lisse, sans évaluation supplémentaire)
+                w = (x - pnl[i - 1]) / (pnl[i] - pnl[i - 1])
+                root = _Z_SCAN[i - 1] + w * (_Z_SCAN[i] - _Z_SCAN[i - 1])
+                if above:
+                    p += _norm_cdf(root) - _norm_cdf(start)
+                else:
+                    start = root
+                above = now
+        if above:
+            p += 1.0 - _norm_cdf(start)
+        probs[t] = p
+    return ev, probs[0], probs[1], 1.0 - probs[2]
+
+
+def _is_vertical(soa: dict[str, np.ndarray]) -> bool:
+    """Deux legs de même type, sens opposés, strikes distincts, même échéance."""
+    return (soa["strike"].shape[0] == 2
+            and soa["is_call"][0] == soa["is_call"][1]
+            and soa["sign"][0] == -soa["sign"][1]
+            and soa["strike"][0] != soa["strike"][1]
+            and soa["dte"][0] == soa["dte"][1])
+
+
+@njit(cache=True)
+def _vertical_core(log_spot: float, drift: float, vol: float, K: np.ndarray,
+                   is_call: np.ndarray, signs: np.ndarray, initial_value: float,
+                   qty: float, T_holding: float, T_remaining: float, r: float,
+                   sigma: float, sigma_move: float, take_profit: float,
+                   ml_threshold: float):
+    """
+    Forme fermée de (EV, P(TP), P(BE), P(ML)) pour un spread vertical, même
+    modèle que _quadrature_pnl_core (GBM sur T_holding à sigma_move, puis prix
+    BS à T_remaining avec sigma).
+
+    - Le P&L au time-stop d'un vertical est monotone en S_T, donc en z :
+      P(P&L ≥ x) = Φ(∓z*) où z* est l'unique racine de P&L(z) = x
+      (bissection sur [-_Z_BOUND, _Z_BOUND]).
+    - E[BS(S_T, K, τ, σ)] = e^(r·T_h) · BS(spot, K, T_h + τ, σ_eff) avec
+      σ_eff² · (T_h + τ) = sigma_move² · T_h + σ² · τ.
+    """
+    pnl_lo = _pnl_at_z(-_Z_BOUND, log_spot, drift, vol, K, is_call, signs,
+                       initial_value, qty, T_remaining, r, sigma)
+    pnl_hi = _pnl_at_z(_Z_BOUND, log_spot, drift, vol, K, is_call, signs,
+                       initial_value, qty, T_remaining, r, sigma)
+    increasing = pnl_hi > pnl_lo
+
+    probs = np.empty(3)
+    thresholds = (take_profit, 0.0, ml_threshold)
+    for t in range(3):
+        x = thresholds[t]
+        # P(P&L ≥ x)
+        if pnl_lo >= x and pnl_hi >= x:
+            probs[t] = 1.0
+            continue
+        if pnl_lo < x and pnl_hi < x:
+            probs[t] = 0.0
+            continue
+        lo, hi = -_Z_BOUND, _Z_BOUND
+        for _ in range(60):
+            mid = 0.5 * (lo + hi)
+            above = _pnl_at_z(mid, log_spot, drift, vol, K, is_call, signs,
+                              initial_value, qty, T_remaining, r, sigma) >= x
+            if above == increasing:
+                hi = mid
+            else:
+                lo = mid
+        z_star = 0.5 * (lo + hi)
+        probs[t] = _norm_cdf(-z_star) if increasing else _norm_cdf(z_star)
+
+    T_total = T_holding + T_remaining
+    sigma_eff = math.sqrt((sigma_move * sigma_move * T_holding
+                           + sigma * sigma * T_remaining) / T_total)
+    spot = math.exp(log_spot)
+    expected_value = 0.0
+    for j in range(K.shape[0]):
+        expected_value += signs[j] * _bs_price_core(spot, K[j], T_total, r, sigma_eff, is_call[j])
+    expected_value *= math.exp(r * T_holding)
+    ev = (expected_value - initial_value) * 100 * qty
+    return ev, probs[0], probs[1], 1.0 - probs[2]
+
+
+def compute_real_probabilities(legs: list | dict, spot: float, dte: int,
                                 sigma: float, qty: int,
                                 take_profit: float, max_risk: float,
                                 sigma_move: float | None = None) -> dict:
@@ -189,7 +588,9 @@ def compute_real_probabilities(legs: list, spot: float, dte: int,
          avec `sigma_move` (vol. historique réalisée).
       2. Le P&L est évalué avec les prix BS à 21 DTE restants,
          en utilisant `sigma` (vol. implicite de la chaîne).
-      3. Intégration sur 500 points z ∈ [-4σ, +4σ].
+      3. Spread vertical : forme fermée ; sinon EV par quadrature de
+         Gauss-Hermite (128 nœuds) et probabilités par les racines de
+         P&L(z) = seuil (balayage uniforme, interpolation linéaire).
 
     Retourne :
       - p_take_profit : P(P&L ≥ take_profit) au time-stop
@@ -206,31 +607,29 @@ def compute_real_probabilities(legs: list, spot: float, dte: int,
 
     # Paramètres GBM : mouvement du sous-jacent avec vol historique
     drift = (RISK_FREE_RATE - 0.5 * sigma_move**2) * T_holding
-    vol = sigma_move * np.sqrt(T_holding)
-
-    # Intégration numérique : 500 points sur [-4σ, +4σ] (99.99%)
-    n_points = 500
-    z_values = np.linspace(-4, 4, n_points)
-    dz = z_values[1] - z_values[0]
-
-    p_take_profit = 0.0
-    p_breakeven = 0.0
-    p_max_loss = 0.0
-    expected_pnl = 0.0  # EV = ∫ P&L(S_T) × f(S_T) dS_T
-
-    for z in z_values:
-        s_t = spot * np.exp(drift + vol * z)
-        prob = norm.pdf(z) * dz
-        # P&L évalué avec sigma (IV) pour le pricing BS des options
-        pnl = simulate_pnl(legs, s_t, remaining_dte, sigma, qty)
-
-        expected_pnl += pnl * prob
-        if pnl >= take_profit:
-            p_take_profit += prob
-        if pnl >= 0:
-            p_breakeven += prob
-        if pnl <= -max_risk * 0.95:
-            p_max_loss += prob
+    vol = sigma_move * math.sqrt(T_holding)
+
+    soa = legs if isinstance(legs, dict) else legs_to_soa(legs)
+    T_remaining = max(remaining_dte, 1) / 365.0
+
+    if sigma > 0 and sigma_move > 0 and _is_vertical(soa):
+        # Spread vertical : forme fermée, pas d'intégration
+        expected_pnl, p_take_profit, p_breakeven, p_max_loss = _vertical_core(
+            math.log(spot), drift, vol, soa["strike"], soa["is_call"], soa["sign"],
+            float(soa["price"] @ soa["sign"]), float(qty), T_holding, T_remaining,
+            float(RISK_FREE_RATE), float(sigma), float(sigma_move),
+            float(take_profit), -max_risk * 0.95,
+        )
+    else:
+        # Quadrature de Gauss-Hermite (EV) et racines P&L = seuil
+        # (probabilités) dans un seul noyau compilé ; P&L évalué avec sigma
+        # (IV) pour le pricing BS des options
+        expected_pnl, p_take_profit, p_breakeven, p_max_loss = _quadrature_pnl_core(
+            math.log(spot), drift, vol, soa["strike"], soa["is_call"], soa["sign"],
+            float(soa["price"] @ soa["sign"]), float(qty),
+            T_remaining, float(RISK_FREE_RATE), float(sigma),
+            float(take_profit), -max_risk * 0.95,
+        )
 
     p_tp_pct = round(max(0.1, min(99.9, p_take_profit * 100)), 1)
     p_be_pct = round(max(0.1, min(99.9, p_breakeven * 100)), 1)
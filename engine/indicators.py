@@ -6,58 +6,181 @@ engine/indicators.py — Indicateurs techniques (IV Rank, Vol, SMA, RSI, Trend)
 from __future__ import annotations
 
 import datetime as dt
+import math
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 import yfinance as yf
 
+from data.yfinance_provider import cached_ticker
+from engine.jit import njit
 
-def compute_iv_rank(ticker: str) -> float:
+
+# Alignements qui disqualifient un trade dans le scanner (surchauffe / contre-tendance)
+REJECTED_ALIGNMENTS = frozenset({
+    "⚠️ Suracheté (Rejet)",
+    "⚠️ Survendu (Rejet)",
+    "⚠️ Élastique tendu (Rejet)",
+    "❌ Contre-tendance",
+})
+
+# Date des prochains résultats par ticker pendant `_EARNINGS_TTL` secondes :
+# le calendrier ne dépend pas du biais, le scanner l'interroge une fois par
+# ticker au lieu d'une fois par (ticker, biais). LRU borné sous verrou : le
+# scanner l'alimente depuis 16 threads.
+_EARNINGS_TTL = 3600
+_EARNINGS_MAX = 256
+_earnings_cache: OrderedDict[str, tuple[float, dt.date | None]] = OrderedDict()
+_earnings_lock = threading.Lock()
+
+
+# ──────────────────────────────────────────────
+# Noyaux numériques (compilés par Numba si disponible)
+# ──────────────────────────────────────────────
+
+@njit(cache=True)
+def _iv_rank_core(log_returns: np.ndarray, window: int) -> float:
+    """
+    IV Rank (proxy vol. historique) à partir des rendements log sans NaN.
+    Retourne NaN si le rang est indéfini (pas de fenêtre complète ou min == max).
+    """
+    n = log_returns.shape[0] - window + 1
+    if n <= 0:
+        return np.nan
+    # Première fenêtre en deux passes, puis mise à jour glissante de Welford
+    # (moyenne et M2 = Σ(x - moyenne)²) : une seule passe O(n) au total.
+    mean = 0.0
+    for j in range(window):
+        mean += log_returns[j]
+    mean /= window
+    m2 = 0.0
+    for j in range(window):
+        m2 += (log_returns[j] - mean) ** 2
+    vols = np.empty(n)
+    vols[0] = np.sqrt(m2 / (window - 1))
+    for i in range(1, n):
+        x_out = log_returns[i - 1]
+        x_in = log_returns[i + window - 1]
+        new_mean = mean + (x_in - x_out) / window
+        m2 += (x_in - x_out) * (x_in - new_mean + x_out - mean)
+        mean = new_mean
+        vols[i] = np.sqrt(max(m2, 0.0) / (window - 1))
+    iv_min = vols.min()
+    iv_max = vols.max()
+    if iv_max == iv_min:
+        return np.nan
+    return 100.0 * (vols[-1] - iv_min) / (iv_max - iv_min)
+
+
+@njit(cache=True)
+def _rsi_core(close: np.ndarray, period: int) -> float:
+    """
+    Dernière valeur du RSI : moyennes exponentielles (span=period, adjust=False)
+    des gains et pertes journaliers, comme `Series.ewm(span=period, adjust=False)`.
+    """
+    alpha = 2.0 / (period + 1)
+    gain = 0.0
+    loss = 0.0
+    for i in range(1, close.shape[0]):
+        delta = close[i] - close[i - 1]
+        up = delta if delta > 0 else 0.0
+        down = -delta if delta < 0 else 0.0
+        gain = (1.0 - alpha) * gain + alpha * up
+        loss = (1.0 - alpha) * loss + alpha * down
+    if loss == 0.0:
+        return 100.0 if gain > 0.0 else np.nan
+    return 100.0 - 100.0 / (1.0 + gain / loss)
+
+
+def log_close_diff(hist: pd.DataFrame) -> np.ndarray:
+    """Rendements log journaliers ln(Cₜ/Cₜ₋₁) des clôtures, NaN exclus (ndarray float64)."""
+    log_returns = np.diff(np.log(hist["Close"].to_numpy(dtype=np.float64)))
+    return log_returns[~np.isnan(log_returns)]
+
+
+def compute_iv_rank(ticker: str, hist: pd.DataFrame | None = None) -> float:
     """
     Calcule l'IV Rank sur 252 jours.
     Utilise la volatilité historique (écart-type annualisé des rendements)
     comme proxy de l'IV si l'API ne fournit pas l'IV directement.
+    hist : historique 1 an déjà téléchargé (évite l'appel yfinance).
     """
-    tk = yf.Ticker(ticker)
-    hist = tk.history(period="1y")
+    if hist is None:
+        hist = cached_ticker(ticker).history(period="1y")
     if len(hist) < 30:
         raise ValueError(f"Historique insuffisant pour « {ticker} » (min 30 jours requis).")
 
-    # Calcule la volatilité historique glissante sur 20 jours
-    log_returns = np.log(hist["Close"] / hist["Close"].shift(1)).dropna()
-    rolling_vol = log_returns.rolling(window=20).std() * np.sqrt(252) * 100  # annualisée en %
-    rolling_vol = rolling_vol.dropna()
+    # Volatilité historique glissante sur 20 jours → rang dans [min, max]
+    iv_rank = _iv_rank_core(log_close_diff(hist), 20)
 
-    if rolling_vol.empty:
+    if np.isnan(iv_rank):
         return 50.0  # valeur par défaut si calcul impossible
 
-    iv_current = rolling_vol.iloc[-1]
-    iv_min = rolling_vol.min()
-    iv_max = rolling_vol.max()
-
-    if iv_max == iv_min:
-        return 50.0
-
-    iv_rank = 100.0 * (iv_current - iv_min) / (iv_max - iv_min)
     return round(float(np.clip(iv_rank, 0, 100)), 1)
 
 
-def compute_historical_vol(ticker: str) -> float | None:
+def compute_historical_vol(ticker: str,
+                           hist: pd.DataFrame | None = None) -> float | None:
     """
     Calcule la volatilité historique réalisée (annualisée) sur 30 jours.
     Retourne None si données insuffisantes.
+
+    hist : historique déjà téléchargé (≥ 31 séances, évite l'appel yfinance).
     """
-    tk = yf.Ticker(ticker)
-    hist = tk.history(period="3mo")
+    if hist is None:
+        hist = cached_ticker(ticker).history(period="3mo")
     if len(hist) < 30:
         return None
-    log_returns = np.log(hist["Close"] / hist["Close"].shift(1)).dropna()
-    sigma_hist = float(log_returns.tail(30).std() * np.sqrt(252))
+    log_returns = log_close_diff(hist)[-30:]
+    if log_returns.size < 2:
+        return None
+    sigma_hist = float(log_returns.std(ddof=1) * math.sqrt(252))
     return sigma_hist if sigma_hist > 0 else None
 
 
+def _earnings_date(ticker: str) -> dt.date | None:
+    """
+    Prochaine date de résultats du ticker (None si inconnue), mémorisée
+    `_EARNINGS_TTL` secondes. Une erreur réseau est propagée sans être mémorisée.
+    """
+    now = time.time()
+    with _earnings_lock:
+        entry = _earnings_cache.get(ticker)
+        if entry is not None and now - entry[0] < _EARNINGS_TTL:
+            _earnings_cache.move_to_end(ticker)
+            return entry[1]
+
+    earnings_date = None
+    cal = yf.Ticker(ticker).calendar
+    if cal is not None and not (hasattr(cal, 'empty') and cal.empty):
+        # cal peut être un DataFrame ou un dict
+        if isinstance(cal, pd.DataFrame):
+            if "Earnings Date" in cal.columns:
+                earnings_date = pd.to_datetime(cal["Earnings Date"].iloc[0]).date()
+            elif "Earnings Date" in cal.index:
+                val = cal.loc["Earnings Date"].iloc[0]
+                earnings_date = pd.to_datetime(val).date()
+        elif isinstance(cal, dict):
+            ed = cal.get("Earnings Date") or cal.get("earnings_date")
+            if ed:
+                if isinstance(ed, list) and len(ed) > 0:
+                    earnings_date = pd.to_datetime(ed[0]).date()
+                else:
+                    earnings_date = pd.to_datetime(ed).date()
+    with _earnings_lock:
+        _earnings_cache[ticker] = (now, earnings_date)
+        _earnings_cache.move_to_end(ticker)
+        while len(_earnings_cache) > _EARNINGS_MAX:
+            _earnings_cache.popitem(last=False)
+    return earnings_date
+
+
 def compute_trend_and_risk_data(ticker: str, spot: float, bias: str,
                                  dte: int, max_risk: float, ev: float,
-                                 max_profit: float):
+                                 max_profit: float,
+                                 hist: pd.DataFrame | None = None):
     """
     Calcule les indicateurs avancés pour un trade validé :
     - EV Yield (%) : rendement de l'EV sur le risque
@@ -65,6 +188,8 @@ def compute_trend_and_risk_data(ticker: str, spot: float, bias: str,
     - SMA 50 : moyenne mobile 50 jours
     - Alignement Tendance : cohérence biais / SMA
     - Earnings Risk : risque de résultats avant le time stop
+
+    hist : historique 6 mois déjà téléchargé (évite l'appel yfinance).
     """
     result = {}
 
@@ -80,21 +205,18 @@ def compute_trend_and_risk_data(ticker: str, spot: float, bias: str,
     current_rsi = None
     dist_sma = None
     try:
-        tk = yf.Ticker(ticker)
-        hist = tk.history(period="6mo")
-        if not hist.empty and len(hist) >= 50:
-            sma50 = float(hist["Close"].rolling(50).mean().iloc[-1])
-        elif not hist.empty:
+        if hist is None:
+            hist = cached_ticker(ticker).history(period="6mo")
+        close = hist["Close"].to_numpy(dtype=np.float64)
+        if close.size >= 50:
+            # Dernière valeur de rolling(50).mean() : moyenne des 50 dernières clôtures
+            sma50 = float(close[-50:].mean())
+        elif close.size:
             sma50 = float(hist["Close"].mean())
 
         # RSI (14 jours)
-        if not hist.empty and len(hist) >= 15:
-            delta = hist['Close'].diff()
-            gain = (delta.where(delta > 0, 0)).ewm(span=14, adjust=False).mean()
-            loss = (-delta.where(delta < 0, 0)).ewm(span=14, adjust=False).mean()
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            current_rsi = float(rsi.iloc[-1])
+        if close.size >= 15:
+            current_rsi = float(_rsi_core(close, 14))
 
         # Distance SMA (%)
         if sma50 is not None and sma50 != 0:
@@ -135,31 +257,11 @@ def compute_trend_and_risk_data(ticker: str, spot: float, bias: str,
     # ── Earnings Risk ──
     time_stop_date = dt.date.today() + dt.timedelta(days=max(1, dte - 21))
     try:
-        tk = yf.Ticker(ticker)
-        cal = tk.calendar
-        if cal is not None and not (hasattr(cal, 'empty') and cal.empty):
-            # cal peut être un DataFrame ou un dict
-            earnings_date = None
-            if isinstance(cal, pd.DataFrame):
-                if "Earnings Date" in cal.columns:
-                    earnings_date = pd.to_datetime(cal["Earnings Date"].iloc[0]).date()
-                elif "Earnings Date" in cal.index:
-                    val = cal.loc["Earnings Date"].iloc[0]
-                    earnings_date = pd.to_datetime(val).date()
-            elif isinstance(cal, dict):
-                ed = cal.get("Earnings Date") or cal.get("earnings_date")
-                if ed:
-                    if isinstance(ed, list) and len(ed) > 0:
-                        earnings_date = pd.to_datetime(ed[0]).date()
-                    else:
-                        earnings_date = pd.to_datetime(ed).date()
-
-            if earnings_date and earnings_date <= time_stop_date:
-                result["earnings_risk"] = "⚠️ Danger"
-            elif earnings_date:
-                result["earnings_risk"] = "✅ OK"
-            else:
-                result["earnings_risk"] = "✅ N/A"
+        earnings_date = _earnings_date(ticker)
+        if earnings_date and earnings_date <= time_stop_date:
+            result["earnings_risk"] = "⚠️ Danger"
+        elif earnings_date:
+            result["earnings_risk"] = "✅ OK"
         else:
             result["earnings_risk"] = "✅ N/A"
     except Exception:
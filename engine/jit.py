@@ -0,0 +1,29 @@
+"""
+engine/jit.py — Compilation JIT optionnelle (Numba)
+====================================================
+Expose `njit` et `vectorize` : les décorateurs Numba si la librairie est
+installée, sinon un décorateur identité / np.vectorize (les noyaux
+s'exécutent en Python/NumPy pur).
+"""
+
+from __future__ import annotations
+
+import numpy as np
+
+try:
+    from numba import njit, vectorize
+    HAS_NUMBA = True
+except ImportError:
+    HAS_NUMBA = False
+
+    def njit(*args, **kwargs):
+        """Fallback sans Numba : retourne la fonction telle quelle."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+    def vectorize(*args, **kwargs):
+        """Fallback sans Numba : ufunc émulée par np.vectorize (signatures ignorées)."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return np.vectorize(args[0])
+        return lambda func: np.vectorize(func)
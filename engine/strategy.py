@@ -7,18 +7,28 @@ Contient build_strategy() et les helpers de sélection de strikes.
 from __future__ import annotations
 
 import datetime as dt
+import threading
+import zoneinfo
+from collections import OrderedDict
 import numpy as np
 import pandas as pd
 
-from config import RISK_FREE_RATE, VOL_INDEX_NAMES
+from config import VOL_INDEX_NAMES
 from engine.black_scholes import (
-    black_scholes_delta,
-    compute_leg_greeks,
+    compute_delta_grid,
+    compute_strategy_greeks,
+    legs_to_soa,
     compute_real_probabilities,
     simulate_pnl,
 )
 from engine.indicators import compute_historical_vol
 
+# Fuseau NYSE résolu une fois à l'import (None si tzdata est absent)
+try:
+    _NY_TZ = zoneinfo.ZoneInfo("America/New_York")
+except Exception:
+    _NY_TZ = None
+
 
 # ──────────────────────────────────────────────
 # Helpers — Sélection de strikes
@@ -34,49 +44,102 @@ def find_strike_by_delta(options_df: pd.DataFrame, S: float, T: float,
     if options_df.empty:
         return None
 
-    deltas = []
-    for _, row in options_df.iterrows():
-        K = float(row["strike"])
-        d = black_scholes_delta(S, K, T, RISK_FREE_RATE, sigma, option_type)
-        deltas.append(abs(d))
+    # Delta de tous les strikes candidats en un seul passage vectorisé
+    deltas = compute_delta_grid(S, options_df["strike"].to_numpy(dtype=np.float64),
+                                T, sigma, option_type)
+    return _row_by_delta(options_df, deltas, target_delta)
 
-    options_df = options_df.copy()
-    options_df["abs_delta"] = deltas
 
-    target_abs = abs(target_delta)
-    idx = (options_df["abs_delta"] - target_abs).abs().idxmin()
-    return options_df.loc[idx]
+def _row_by_delta(options_df: pd.DataFrame, deltas: np.ndarray,
+                  target_delta: float) -> pd.Series:
+    """
+    Ligne dont le Delta précalculé (aligné sur options_df) est le plus
+    proche de target_delta. Sélection par position (pas de copie ni de
+    colonne intermédiaire).
+    """
+    idx = int(np.argmin(np.abs(np.abs(deltas) - abs(target_delta))))
+    return options_df.iloc[idx]
 
 
-def get_mid_price(row: pd.Series) -> float:
+def get_mid_price(bid: float, ask: float, last: float = 0.0) -> float:
     """
     Retourne le prix moyen (bid+ask)/2.
     Fallback sur lastPrice si bid/ask sont absents (fréquent avec yfinance).
     """
-    bid = row.get("bid", 0) or 0
-    ask = row.get("ask", 0) or 0
+    bid = bid or 0
+    ask = ask or 0
     if bid > 0 and ask > 0:
-        return round((bid + ask) / 2, 2)
+        # np.round : même arrondi qu'avec les scalaires NumPy d'une pd.Series
+        return float(np.round((bid + ask) / 2, 2))
     # Fallback : utiliser lastPrice si disponible
-    last = row.get("lastPrice", 0) or 0
+    last = last or 0
     if last > 0:
         return round(float(last), 2)
     return 0.0
 
 
-def estimate_sigma(options_df: pd.DataFrame, S: float) -> float:
+def _leg_mid_price(row) -> float:
+    """
+    get_mid_price d'une ligne de chaîne : namedtuple de _rows_by_strike
+    (accès par attribut) ou pd.Series (accès par clé) ; None → 0.0.
+    """
+    if row is None:
+        return 0.0
+    if isinstance(row, tuple):
+        return get_mid_price(row.bid, row.ask, getattr(row, "lastPrice", 0))
+    return get_mid_price(row["bid"], row["ask"], row.get("lastPrice", 0))
+
+
+def estimate_sigma(options_df: pd.DataFrame | tuple[pd.DataFrame, ...],
+                   S: float | None = None) -> float:
     """
     Estime la volatilité implicite moyenne à partir des IV de la chaîne.
+    options_df : une chaîne ou un tuple de chaînes (ex. (calls, puts)), dont
+    les colonnes IV sont concaténées en NumPy sans fusionner les DataFrames.
+    S : inutilisé, conservé pour la compatibilité des appels existants.
     Fallback à 0.25 si indisponible.
     """
-    if "impliedVolatility" in options_df.columns:
-        ivs = options_df["impliedVolatility"].dropna()
-        ivs = ivs[ivs > 0]
-        if not ivs.empty:
-            return float(ivs.median())
+    frames = options_df if isinstance(options_df, tuple) else (options_df,)
+    cols = [df["impliedVolatility"].to_numpy(dtype=np.float64)
+            for df in frames if "impliedVolatility" in df.columns]
+    if cols:
+        ivs = np.concatenate(cols)
+        ivs = ivs[ivs > 0]  # écarte aussi les NaN
+        if ivs.size:
+            return float(np.median(ivs))
     return 0.25
 
 
+def _nearest_strike(strikes: np.ndarray, target: float, *,
+                    below: float | None = None, above: float | None = None) -> float | None:
+    """
+    Strike de `strikes` (trié croissant, unique) le plus proche de `target`,
+    le plus bas en cas d'égalité, parmi les strikes strictement inférieurs à
+    `below` et/ou strictement supérieurs à `above`. None si aucun candidat.
+    Recherche dichotomique (np.searchsorted) : ni masque ni copie du tableau.
+    """
+    lo = 0 if above is None else int(np.searchsorted(strikes, above, "right"))
+    hi = strikes.size if below is None else int(np.searchsorted(strikes, below, "left"))
+    if lo >= hi:
+        return None
+    # Premier strike ≥ target dans [lo, hi), comparé à son voisin inférieur
+    i = min(max(int(np.searchsorted(strikes, target, "left")), lo), hi - 1)
+    if i > lo and abs(strikes[i - 1] - target) <= abs(strikes[i] - target):
+        i -= 1
+    return float(strikes[i])
+
+
+def _rows_by_strike(df: pd.DataFrame) -> dict:
+    """
+    Index strike → ligne (namedtuple) de la chaîne, première occurrence
+    conservée comme avec df[df["strike"] == K].iloc[0].
+    """
+    rows = {}
+    for rec in df.itertuples(index=False):
+        rows.setdefault(float(rec.strike), rec)
+    return rows
+
+
 def filter_liquid_options(df: pd.DataFrame) -> pd.DataFrame:
     """
     Filtre les options illiquides de la chaîne.
@@ -85,42 +148,151 @@ def filter_liquid_options(df: pd.DataFrame) -> pd.DataFrame:
     """
     if df.empty:
         return df
-    filtered = df.copy()
+    bid = df["bid"].to_numpy(dtype=np.float64)
+    ask = df["ask"].to_numpy(dtype=np.float64)
 
     # Synthétiser bid/ask à partir de lastPrice quand absents
-    if "lastPrice" in filtered.columns:
-        mask_no_bid = filtered["bid"] <= 0
-        mask_has_last = filtered["lastPrice"] > 0
-        synth = mask_no_bid & mask_has_last
+    # (spread synthétique de ±2% autour du lastPrice)
+    synth = np.zeros(len(df), dtype=bool)
+    if "lastPrice" in df.columns:
+        last = df["lastPrice"].to_numpy(dtype=np.float64)
+        synth = (bid <= 0) & (last > 0)
         if synth.any():
-            # Créer un spread synthétique de ±2% autour du lastPrice
-            filtered.loc[synth, "bid"] = (filtered.loc[synth, "lastPrice"] * 0.98).round(2)
-            filtered.loc[synth, "ask"] = (filtered.loc[synth, "lastPrice"] * 1.02).round(2)
-
-    # Exclure bid == 0 (même après synthèse)
-    filtered = filtered[filtered["bid"] > 0]
-    # Exclure open interest trop faible
-    if "openInterest" in filtered.columns:
-        filtered = filtered[filtered["openInterest"] >= 10]
-    # Exclure spread bid/ask excessif
-    mid = (filtered["bid"] + filtered["ask"]) / 2
-    spread_pct = (filtered["ask"] - filtered["bid"]) / mid
-    filtered = filtered[spread_pct <= 0.40]
+            bid = np.where(synth, np.round(last * 0.98, 2), bid)
+            ask = np.where(synth, np.round(last * 1.02, 2), ask)
+
+    # Un seul masque sur la chaîne d'origine : bid > 0 (même après synthèse),
+    # open interest suffisant, spread bid/ask ≤ 40 % du mid
+    mask = bid > 0
+    if "openInterest" in df.columns:
+        mask &= df["openInterest"].to_numpy(dtype=np.float64) >= 10
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mask &= (ask - bid) / ((bid + ask) / 2) <= 0.40
+
+    filtered = df.loc[mask]
+    if synth[mask].any():
+        filtered = filtered.assign(bid=bid[mask], ask=ask[mask])
     return filtered.reset_index(drop=True)
 
 
+# Contextes de chaîne récents, par identité des DataFrames bruts (les chaînes
+# du cache de l'app sont partagées en lecture seule : le scanner construit les
+# 3 biais d'un ticker sur les mêmes objets). Les DataFrames bruts sont gardés
+# dans l'entrée pour qu'un id ne puisse pas être réattribué tant qu'elle vit.
+# LRU borné, protégé par un verrou : le scanner y accède depuis 16 threads.
+_CHAIN_CONTEXT_MAX = 64
+_chain_contexts: OrderedDict[tuple[int, int], tuple[pd.DataFrame, pd.DataFrame, dict]] = OrderedDict()
+_chain_contexts_lock = threading.Lock()
+
+
+def _chain_context(calls: pd.DataFrame, puts: pd.DataFrame) -> dict:
+    """
+    Précalculs d'une chaîne ~45 DTE indépendants du biais et du budget :
+    chaînes filtrées (liquidité), sigma estimée, strikes triés uniques et
+    index strike → ligne par côté. Calculés une fois par couple (calls, puts).
+    """
+    key = (id(calls), id(puts))
+    with _chain_contexts_lock:
+        entry = _chain_contexts.get(key)
+        if entry is not None and entry[0] is calls and entry[1] is puts:
+            _chain_contexts.move_to_end(key)
+            return entry[2]
+
+    # Calcul hors verrou : deux threads sur la même chaîne produisent le même contexte
+    liquid_calls = filter_liquid_options(calls)
+    liquid_puts = filter_liquid_options(puts)
+    ctx = {
+        "calls": liquid_calls,
+        "puts": liquid_puts,
+        "sigma": estimate_sigma((liquid_calls, liquid_puts)),
+        # Strikes triés et uniques par côté, partagés par le placement des jambes
+        "put_strikes": np.unique(liquid_puts["strike"].to_numpy(dtype=np.float64)),
+        "call_strikes": np.unique(liquid_calls["strike"].to_numpy(dtype=np.float64)),
+        "put_by_strike": _rows_by_strike(liquid_puts),
+        "call_by_strike": _rows_by_strike(liquid_calls),
+    }
+    with _chain_contexts_lock:
+        _chain_contexts[key] = (calls, puts, ctx)
+        _chain_contexts.move_to_end(key)
+        while len(_chain_contexts) > _CHAIN_CONTEXT_MAX:
+            _chain_contexts.popitem(last=False)
+    return ctx
+
+
+def _build_debit_spread(options_df: pd.DataFrame, deltas: np.ndarray,
+                        strikes: np.ndarray, by_strike: dict, *,
+                        anchor_delta: float, is_call: bool, target_width: float,
+                        budget: float, ticker: str, exp_str: str, dte: int,
+                        name: str) -> tuple[list[dict], float, float]:
+    """
+    Spread vertical en débit (Bull Call si is_call, sinon Bear Put) : achat
+    au delta d'ancrage, vente au strike le plus proche de target_width plus
+    loin hors de la monnaie. Retourne (legs, max_risk, max_profit) ou lève
+    ValueError (strikes, prix ou budget incompatibles).
+    """
+    buy = _row_by_delta(options_df, deltas, anchor_delta)
+    buy_strike = float(buy["strike"])
+    buy_price = _leg_mid_price(buy)
+
+    # Jambe de protection : au-dessus pour les calls, en dessous pour les puts
+    if is_call:
+        sell_strike = _nearest_strike(strikes, buy_strike + target_width, above=buy_strike)
+    else:
+        sell_strike = _nearest_strike(strikes, buy_strike - target_width, below=buy_strike)
+    if sell_strike is None:
+        raise ValueError(f"Pas de strikes de protection disponibles pour le {name}.")
+    sell_price = _leg_mid_price(by_strike.get(sell_strike))
+
+    net_debit = buy_price - sell_price
+    width = abs(sell_strike - buy_strike)
+
+    if width > target_width * 3:
+        raise ValueError(
+            f"Les strikes disponibles sur « {ticker} » sont trop espacés "
+            f"(écart réel : {width:.0f}$ vs cible : {target_width:.0f}$). "
+            f"Chaîne d'options trop peu liquide pour un spread fiable."
+        )
+
+    if net_debit <= 0 or net_debit >= width:
+        raise ValueError(
+            "Les prix de la chaîne d'options sont illogiques "
+            "(illiquidité majeure ou bid/ask cassé). "
+            "Analyse annulée pour votre sécurité."
+        )
+
+    max_risk = net_debit * 100
+    max_profit = (width * 100) - max_risk
+
+    if max_risk > budget:
+        raise ValueError(
+            f"Budget insuffisant ({budget}\\$) pour un {name} standard sur {ticker}. "
+            f"Risque par contrat : {max_risk:.0f}\\$."
+        )
+
+    option_type = "Call" if is_call else "Put"
+    legs = [
+        {"action": "BUY", "type": option_type, "strike": buy_strike,
+         "exp": exp_str, "dte": dte, "price": buy_price},
+        {"action": "SELL", "type": option_type, "strike": sell_strike,
+         "exp": exp_str, "dte": dte, "price": sell_price},
+    ]
+    return legs, max_risk, max_profit
+
+
 # ──────────────────────────────────────────────
 # Moteur principal
 # ──────────────────────────────────────────────
 
 def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                    budget: float, ticker: str, vol_symbol: str = "^VIX",
-                   *, data_provider=None):
+                   *, data_provider=None, hist: pd.DataFrame | None = None):
     """
     Moteur principal. Sélectionne et construit la stratégie optimale.
     Retourne un dict avec : name, explanation, legs, metrics, exit_plan.
 
     data_provider: instance de DataProvider (si None, utilise YFinanceProvider).
+    hist: historique de prix déjà téléchargé, partagé avec compute_trend_and_risk_data
+          (si None, la volatilité réalisée est téléchargée).
     """
     if data_provider is None:
         from data.yfinance_provider import YFinanceProvider
@@ -129,17 +301,13 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
     # --- Récupération de la chaîne d'options ~45 DTE ---
     exp_str, calls, puts, dte = data_provider.get_options_chain(ticker)
 
-    # --- RISK MANAGER : Filtre de liquidité ---
-    calls = filter_liquid_options(calls)
-    puts = filter_liquid_options(puts)
+    # --- RISK MANAGER : Filtre de liquidité (+ précalculs de la chaîne) ---
+    ctx = _chain_context(calls, puts)
+    calls, puts = ctx["calls"], ctx["puts"]
     if len(calls) < 3 or len(puts) < 3:
         # Détection horaires de marché US (NYSE : 9h30-16h00 ET)
-        import zoneinfo
         now_local = dt.datetime.now().astimezone()
-        try:
-            now_et = dt.datetime.now(zoneinfo.ZoneInfo("America/New_York"))
-        except Exception:
-            now_et = now_local  # fallback
+        now_et = dt.datetime.now(_NY_TZ) if _NY_TZ is not None else now_local  # fallback
         market_open_et = now_et.replace(hour=9, minute=30, second=0, microsecond=0)
         market_close_et = now_et.replace(hour=16, minute=0, second=0, microsecond=0)
         is_weekday = now_et.weekday() < 5
@@ -179,7 +347,19 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
         )
 
     T = dte / 365.0
-    sigma = estimate_sigma(pd.concat([calls, puts]), spot)
+    sigma = ctx["sigma"]
+    put_strikes, call_strikes = ctx["put_strikes"], ctx["call_strikes"]
+    put_by_strike, call_by_strike = ctx["put_by_strike"], ctx["call_by_strike"]
+
+    # Deltas de toute la chaîne en un passage par côté : chaque sélection de
+    # jambe par delta se réduit ensuite à un argmin
+    put_deltas = compute_delta_grid(spot, puts["strike"].to_numpy(dtype=np.float64),
+                                    T, sigma, "put")
+    call_deltas = compute_delta_grid(spot, calls["strike"].to_numpy(dtype=np.float64),
+                                     T, sigma, "call")
+
+    # Largeur cible des spreads (~1.5% du spot, min 1$), commune à toutes les branches
+    target_width = max(1.0, round(spot * 0.015))
 
     result = {
         "name": "",
@@ -209,8 +389,8 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 "capturant le retour statistique à la moyenne de la volatilité."
             ).format(iv_rank, VOL_INDEX_NAMES.get(vol_symbol, "VIX"), vix)
 
-            sell_put = find_strike_by_delta(puts, spot, T, sigma, -0.16, "put")
-            sell_call = find_strike_by_delta(calls, spot, T, sigma, 0.16, "call")
+            sell_put = _row_by_delta(puts, put_deltas, -0.16)
+            sell_call = _row_by_delta(calls, call_deltas, 0.16)
 
             if sell_put is None or sell_call is None:
                 raise ValueError("Impossible de trouver les strikes appropriés dans la chaîne d'options.")
@@ -226,45 +406,29 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
             sym_put_target = spot - sym_dist
             sym_call_target = spot + sym_dist
 
-            put_strikes_all = sorted(puts["strike"].unique())
-            call_strikes_all = sorted(calls["strike"].unique())
-
-            sell_put_candidates = [s for s in put_strikes_all if s < spot]
-            sell_call_candidates = [s for s in call_strikes_all if s > spot]
+            sym_put_strike = _nearest_strike(put_strikes, sym_put_target, below=spot)
+            sym_call_strike = _nearest_strike(call_strikes, sym_call_target, above=spot)
 
-            if sell_put_candidates and sell_call_candidates:
-                sell_put_strike = min(sell_put_candidates, key=lambda x: abs(x - sym_put_target))
-                sell_call_strike = min(sell_call_candidates, key=lambda x: abs(x - sym_call_target))
-                sell_put_row = puts[puts["strike"] == sell_put_strike]
-                sell_call_row = calls[calls["strike"] == sell_call_strike]
-                if not sell_put_row.empty:
-                    sell_put = sell_put_row.iloc[0]
-                if not sell_call_row.empty:
-                    sell_call = sell_call_row.iloc[0]
-
-            target_width = max(1.0, round(spot * 0.015))
-            put_strikes = sorted(puts["strike"].unique())
-            call_strikes = sorted(calls["strike"].unique())
+            if sym_put_strike is not None and sym_call_strike is not None:
+                sell_put_strike, sell_call_strike = sym_put_strike, sym_call_strike
+                sell_put = put_by_strike[sell_put_strike]
+                sell_call = call_by_strike[sell_call_strike]
 
             buy_put_target = sell_put_strike - target_width
-            candidates_put = [s for s in put_strikes if s < sell_put_strike]
-            if not candidates_put:
+            buy_put_strike = _nearest_strike(put_strikes, buy_put_target, below=sell_put_strike)
+            if buy_put_strike is None:
                 raise ValueError("Pas de strikes de protection disponibles pour le Put side de l'Iron Condor.")
-            buy_put_strike = min(candidates_put, key=lambda x: abs(x - buy_put_target))
 
             buy_call_target = sell_call_strike + target_width
-            candidates_call = [s for s in call_strikes if s > sell_call_strike]
-            if not candidates_call:
+            buy_call_strike = _nearest_strike(call_strikes, buy_call_target, above=sell_call_strike)
+            if buy_call_strike is None:
                 raise ValueError("Pas de strikes de protection disponibles pour le Call side de l'Iron Condor.")
-            buy_call_strike = min(candidates_call, key=lambda x: abs(x - buy_call_target))
 
-            sell_put_price = get_mid_price(sell_put)
-            sell_call_price = get_mid_price(sell_call)
+            sell_put_price = _leg_mid_price(sell_put)
+            sell_call_price = _leg_mid_price(sell_call)
 
-            buy_put_row = puts[puts["strike"] == buy_put_strike]
-            buy_call_row = calls[calls["strike"] == buy_call_strike]
-            buy_put_price = get_mid_price(buy_put_row.iloc[0]) if not buy_put_row.empty else 0.0
-            buy_call_price = get_mid_price(buy_call_row.iloc[0]) if not buy_call_row.empty else 0.0
+            buy_put_price = _leg_mid_price(put_by_strike.get(buy_put_strike))
+            buy_call_price = _leg_mid_price(call_by_strike.get(buy_call_strike))
 
             net_credit = (sell_put_price + sell_call_price) - (buy_put_price + buy_call_price)
             put_width = sell_put_strike - buy_put_strike
@@ -318,21 +482,17 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 "directionnel tout en collectant une prime statistiquement avantageuse."
             ).format(iv_rank)
 
-            sell_put = find_strike_by_delta(puts, spot, T, sigma, -0.20, "put")
+            sell_put = _row_by_delta(puts, put_deltas, -0.20)
             if sell_put is None:
                 raise ValueError("Impossible de trouver le strike approprié.")
             sell_put_strike = float(sell_put["strike"])
-            sell_put_price = get_mid_price(sell_put)
-
-            target_width = max(1.0, round(spot * 0.015))
-            put_strikes = sorted([s for s in puts["strike"].unique() if s < sell_put_strike])
-            if not put_strikes:
-                raise ValueError("Pas de strikes de protection disponibles pour le Bull Put Spread.")
+            sell_put_price = _leg_mid_price(sell_put)
 
             buy_put_target = sell_put_strike - target_width
-            buy_put_strike = min(put_strikes, key=lambda x: abs(x - buy_put_target))
-            buy_put_row = puts[puts["strike"] == buy_put_strike]
-            buy_put_price = get_mid_price(buy_put_row.iloc[0]) if not buy_put_row.empty else 0.0
+            buy_put_strike = _nearest_strike(put_strikes, buy_put_target, below=sell_put_strike)
+            if buy_put_strike is None:
+                raise ValueError("Pas de strikes de protection disponibles pour le Bull Put Spread.")
+            buy_put_price = _leg_mid_price(put_by_strike.get(buy_put_strike))
 
             net_credit = sell_put_price - buy_put_price
             width = sell_put_strike - buy_put_strike
@@ -380,21 +540,17 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 "grâce à la protection supérieure."
             ).format(iv_rank)
 
-            sell_call = find_strike_by_delta(calls, spot, T, sigma, 0.20, "call")
+            sell_call = _row_by_delta(calls, call_deltas, 0.20)
             if sell_call is None:
                 raise ValueError("Impossible de trouver le strike approprié.")
             sell_call_strike = float(sell_call["strike"])
-            sell_call_price = get_mid_price(sell_call)
-
-            target_width = max(1.0, round(spot * 0.015))
-            call_strikes = sorted([s for s in calls["strike"].unique() if s > sell_call_strike])
-            if not call_strikes:
-                raise ValueError("Pas de strikes de protection disponibles pour le Bear Call Spread.")
+            sell_call_price = _leg_mid_price(sell_call)
 
             buy_call_target = sell_call_strike + target_width
-            buy_call_strike = min(call_strikes, key=lambda x: abs(x - buy_call_target))
-            buy_call_row = calls[calls["strike"] == buy_call_strike]
-            buy_call_price = get_mid_price(buy_call_row.iloc[0]) if not buy_call_row.empty else 0.0
+            buy_call_strike = _nearest_strike(call_strikes, buy_call_target, above=sell_call_strike)
+            if buy_call_strike is None:
+                raise ValueError("Pas de strikes de protection disponibles pour le Bear Call Spread.")
+            buy_call_price = _leg_mid_price(call_by_strike.get(buy_call_strike))
 
             net_credit = sell_call_price - buy_call_price
             width = buy_call_strike - sell_call_strike
@@ -459,13 +615,13 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
             if buy_call is None:
                 raise ValueError("Impossible de trouver un LEAPS approprié.")
             buy_call_strike = float(buy_call["strike"])
-            buy_call_price = get_mid_price(buy_call)
+            buy_call_price = _leg_mid_price(buy_call)
 
-            sell_call = find_strike_by_delta(calls, spot, T, sigma, 0.30, "call")
+            sell_call = _row_by_delta(calls, call_deltas, 0.30)
             if sell_call is None:
                 raise ValueError("Impossible de trouver le call court terme.")
             sell_call_strike = float(sell_call["strike"])
-            sell_call_price = get_mid_price(sell_call)
+            sell_call_price = _leg_mid_price(sell_call)
 
             net_debit = buy_call_price - sell_call_price
 
@@ -511,18 +667,21 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 raise ValueError("Pas d'expiration court terme disponible pour le Calendar Spread.")
             short_exp, short_calls, _, short_dte = short_chain
 
-            atm_strike = min(calls["strike"], key=lambda x: abs(x - spot))
+            atm_strike = _nearest_strike(call_strikes, spot)
 
-            short_row = short_calls[short_calls["strike"] == atm_strike]
-            if short_row.empty:
-                short_row = short_calls.iloc[(short_calls["strike"] - atm_strike).abs().argsort()[:1]]
-                atm_strike = float(short_row["strike"].iloc[0])
-            sell_price = get_mid_price(short_row.iloc[0])
+            # Strike ATM de la chaîne courte (exact, sinon le plus proche) :
+            # distance nulle en cas de correspondance, un seul argmin NumPy
+            short_strikes = short_calls["strike"].to_numpy(dtype=np.float64)
+            if short_strikes.size == 0:
+                raise ValueError("Pas d'expiration court terme disponible pour le Calendar Spread.")
+            short_row = short_calls.iloc[int(np.argmin(np.abs(short_strikes - atm_strike)))]
+            atm_strike = float(short_row["strike"])
+            sell_price = _leg_mid_price(short_row)
 
-            long_row = calls[calls["strike"] == atm_strike]
-            if long_row.empty:
-                long_row = calls.iloc[(calls["strike"] - atm_strike).abs().argsort()[:1]]
-            buy_price = get_mid_price(long_row.iloc[0])
+            long_row = call_by_strike.get(atm_strike)
+            if long_row is None:
+                long_row = call_by_strike[_nearest_strike(call_strikes, atm_strike)]
+            buy_price = _leg_mid_price(long_row)
 
             net_debit = buy_price - sell_price
 
@@ -559,54 +718,12 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 "de profiter d'une baisse tout en limitant le risque au débit payé."
             )
 
-            buy_put = find_strike_by_delta(puts, spot, T, sigma, -0.45, "put")
-            if buy_put is None:
-                raise ValueError("Impossible de construire le Bear Put Spread.")
-            buy_put_strike = float(buy_put["strike"])
-            buy_put_price = get_mid_price(buy_put)
-
-            target_width = max(1.0, round(spot * 0.015))
-            put_strikes = sorted([s for s in puts["strike"].unique() if s < buy_put_strike])
-            if not put_strikes:
-                raise ValueError("Pas de strikes de protection disponibles pour le Bear Put Spread.")
-
-            sell_put_target = buy_put_strike - target_width
-            sell_put_strike = min(put_strikes, key=lambda x: abs(x - sell_put_target))
-            sell_put_row = puts[puts["strike"] == sell_put_strike]
-            sell_put_price = get_mid_price(sell_put_row.iloc[0]) if not sell_put_row.empty else 0.0
-
-            net_debit = buy_put_price - sell_put_price
-            width = buy_put_strike - sell_put_strike
-
-            if width > target_width * 3:
-                raise ValueError(
-                    f"Les strikes disponibles sur « {ticker} » sont trop espacés "
-                    f"(écart réel : {width:.0f}$ vs cible : {target_width:.0f}$). "
-                    f"Chaîne d'options trop peu liquide pour un spread fiable."
-                )
-
-            if net_debit <= 0 or net_debit >= width:
-                raise ValueError(
-                    "Les prix de la chaîne d'options sont illogiques "
-                    "(illiquidité majeure ou bid/ask cassé). "
-                    "Analyse annulée pour votre sécurité."
-                )
-
-            max_risk = net_debit * 100
-            max_profit = (width * 100) - max_risk
-
-            if max_risk > budget:
-                raise ValueError(
-                    f"Budget insuffisant ({budget}\\$) pour un Bear Put Spread standard sur {ticker}. "
-                    f"Risque par contrat : {max_risk:.0f}\\$."
-                )
-
-            result["legs"] = [
-                {"action": "BUY", "type": "Put", "strike": buy_put_strike,
-                 "exp": exp_str, "dte": dte, "price": buy_put_price},
-                {"action": "SELL", "type": "Put", "strike": sell_put_strike,
-                 "exp": exp_str, "dte": dte, "price": sell_put_price},
-            ]
+            result["legs"], max_risk, max_profit = _build_debit_spread(
+                puts, put_deltas, put_strikes, put_by_strike,
+                anchor_delta=-0.45, is_call=False, target_width=target_width,
+                budget=budget, ticker=ticker, exp_str=exp_str, dte=dte,
+                name="Bear Put Spread",
+            )
             result["credit_or_debit"] = round(-max_risk, 2)
             result["max_risk"] = round(max_risk, 2)
             result["max_profit"] = round(max_profit, 2)
@@ -627,20 +744,22 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 "la prime, soit vous achetez l'action à un prix réduit."
             ).format(iv_rank, budget)
 
-            sell_put = find_strike_by_delta(puts, spot, T, sigma, -0.25, "put")
+            sell_put = _row_by_delta(puts, put_deltas, -0.25)
             if sell_put is None:
                 raise ValueError("Impossible de trouver le strike approprié.")
             sell_put_strike = float(sell_put["strike"])
-            sell_put_price = get_mid_price(sell_put)
+            sell_put_price = _leg_mid_price(sell_put)
 
             max_risk = (sell_put_strike * 100) - (sell_put_price * 100)
             if max_risk > budget:
-                lower_puts = puts[puts["strike"] * 100 - sell_put_price * 100 <= budget]
-                if lower_puts.empty:
+                # Strikes couverts par le budget, puis le plus proche de budget / 100
+                strikes = puts["strike"].to_numpy(dtype=np.float64)
+                affordable = np.flatnonzero(strikes * 100 - sell_put_price * 100 <= budget)
+                if affordable.size == 0:
                     raise ValueError(f"Budget insuffisant ({budget}\\$) pour un Cash Secured Put sur {ticker}.")
-                sell_put = lower_puts.iloc[(lower_puts["strike"] - (budget / 100)).abs().argsort()[:1]].iloc[0]
+                sell_put = puts.iloc[int(affordable[np.argmin(np.abs(strikes[affordable] - budget / 100))])]
                 sell_put_strike = float(sell_put["strike"])
-                sell_put_price = get_mid_price(sell_put)
+                sell_put_price = _leg_mid_price(sell_put)
                 max_risk = (sell_put_strike * 100) - (sell_put_price * 100)
 
             result["legs"] = [
@@ -661,54 +780,12 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                     "offre un profil risque/rendement défini avec un biais long."
                 ).format(iv_rank)
 
-                buy_call = find_strike_by_delta(calls, spot, T, sigma, 0.50, "call")
-                if buy_call is None:
-                    raise ValueError("Impossible de construire le Bull Call Spread.")
-                buy_call_strike = float(buy_call["strike"])
-                buy_call_price = get_mid_price(buy_call)
-
-                target_width = max(1.0, round(spot * 0.015))
-                call_strikes = sorted([s for s in calls["strike"].unique() if s > buy_call_strike])
-                if not call_strikes:
-                    raise ValueError("Pas de strikes de protection disponibles pour le Bull Call Spread.")
-
-                sell_call_target = buy_call_strike + target_width
-                sell_call_strike = min(call_strikes, key=lambda x: abs(x - sell_call_target))
-                sell_call_row = calls[calls["strike"] == sell_call_strike]
-                sell_call_price = get_mid_price(sell_call_row.iloc[0]) if not sell_call_row.empty else 0.0
-
-                net_debit = buy_call_price - sell_call_price
-                width = sell_call_strike - buy_call_strike
-
-                if width > target_width * 3:
-                    raise ValueError(
-                        f"Les strikes disponibles sur « {ticker} » sont trop espacés "
-                        f"(écart réel : {width:.0f}$ vs cible : {target_width:.0f}$). "
-                        f"Chaîne d'options trop peu liquide pour un spread fiable."
-                    )
-
-                if net_debit <= 0 or net_debit >= width:
-                    raise ValueError(
-                        "Les prix de la chaîne d'options sont illogiques "
-                        "(illiquidité majeure ou bid/ask cassé). "
-                        "Analyse annulée pour votre sécurité."
-                    )
-
-                max_risk = net_debit * 100
-                max_profit = (width * 100) - max_risk
-
-                if max_risk > budget:
-                    raise ValueError(
-                        f"Budget insuffisant ({budget}\\$) pour un Bull Call Spread standard sur {ticker}. "
-                        f"Risque par contrat : {max_risk:.0f}\\$."
-                    )
-
-                result["legs"] = [
-                    {"action": "BUY", "type": "Call", "strike": buy_call_strike,
-                     "exp": exp_str, "dte": dte, "price": buy_call_price},
-                    {"action": "SELL", "type": "Call", "strike": sell_call_strike,
-                     "exp": exp_str, "dte": dte, "price": sell_call_price},
-                ]
+                result["legs"], max_risk, max_profit = _build_debit_spread(
+                    calls, call_deltas, call_strikes, call_by_strike,
+                    anchor_delta=0.50, is_call=True, target_width=target_width,
+                    budget=budget, ticker=ticker, exp_str=exp_str, dte=dte,
+                    name="Bull Call Spread",
+                )
                 result["credit_or_debit"] = round(-max_risk, 2)
                 result["max_risk"] = round(max_risk, 2)
                 result["max_profit"] = round(max_profit, 2)
@@ -722,54 +799,12 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                     "profite de la baisse anticipée tout en définissant un risque maximal strict."
                 ).format(iv_rank)
 
-                buy_put = find_strike_by_delta(puts, spot, T, sigma, -0.50, "put")
-                if buy_put is None:
-                    raise ValueError("Impossible de construire le Bear Put Spread.")
-                buy_put_strike = float(buy_put["strike"])
-                buy_put_price = get_mid_price(buy_put)
-
-                target_width = max(1.0, round(spot * 0.015))
-                put_strikes = sorted([s for s in puts["strike"].unique() if s < buy_put_strike])
-                if not put_strikes:
-                    raise ValueError("Pas de strikes de protection disponibles pour le Bear Put Spread.")
-
-                sell_put_target = buy_put_strike - target_width
-                sell_put_strike = min(put_strikes, key=lambda x: abs(x - sell_put_target))
-                sell_put_row = puts[puts["strike"] == sell_put_strike]
-                sell_put_price = get_mid_price(sell_put_row.iloc[0]) if not sell_put_row.empty else 0.0
-
-                net_debit = buy_put_price - sell_put_price
-                width = buy_put_strike - sell_put_strike
-
-                if width > target_width * 3:
-                    raise ValueError(
-                        f"Les strikes disponibles sur « {ticker} » sont trop espacés "
-                        f"(écart réel : {width:.0f}$ vs cible : {target_width:.0f}$). "
-                        f"Chaîne d'options trop peu liquide pour un spread fiable."
-                    )
-
-                if net_debit <= 0 or net_debit >= width:
-                    raise ValueError(
-                        "Les prix de la chaîne d'options sont illogiques "
-                        "(illiquidité majeure ou bid/ask cassé). "
-                        "Analyse annulée pour votre sécurité."
-                    )
-
-                max_risk = net_debit * 100
-                max_profit = (width * 100) - max_risk
-
-                if max_risk > budget:
-                    raise ValueError(
-                        f"Budget insuffisant ({budget}\\$) pour un Bear Put Spread standard sur {ticker}. "
-                        f"Risque par contrat : {max_risk:.0f}\\$."
-                    )
-
-                result["legs"] = [
-                    {"action": "BUY", "type": "Put", "strike": buy_put_strike,
-                     "exp": exp_str, "dte": dte, "price": buy_put_price},
-                    {"action": "SELL", "type": "Put", "strike": sell_put_strike,
-                     "exp": exp_str, "dte": dte, "price": sell_put_price},
-                ]
+                result["legs"], max_risk, max_profit = _build_debit_spread(
+                    puts, put_deltas, put_strikes, put_by_strike,
+                    anchor_delta=-0.50, is_call=False, target_width=target_width,
+                    budget=budget, ticker=ticker, exp_str=exp_str, dte=dte,
+                    name="Bear Put Spread",
+                )
                 result["credit_or_debit"] = round(-max_risk, 2)
                 result["max_risk"] = round(max_risk, 2)
                 result["max_profit"] = round(max_profit, 2)
@@ -785,8 +820,8 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                     "reste entre les strikes vendus à l'expiration."
                 )
 
-                sell_put = find_strike_by_delta(puts, spot, T, sigma, -0.16, "put")
-                sell_call = find_strike_by_delta(calls, spot, T, sigma, 0.16, "call")
+                sell_put = _row_by_delta(puts, put_deltas, -0.16)
+                sell_call = _row_by_delta(calls, call_deltas, 0.16)
 
                 if sell_put is None or sell_call is None:
                     raise ValueError("Impossible de trouver les strikes appropriés pour l'Iron Condor.")
@@ -801,44 +836,29 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
                 sym_put_target = spot - sym_dist
                 sym_call_target = spot + sym_dist
 
-                put_strikes_all = sorted(puts["strike"].unique())
-                call_strikes_all = sorted(calls["strike"].unique())
-                sell_put_candidates = [s for s in put_strikes_all if s < spot]
-                sell_call_candidates = [s for s in call_strikes_all if s > spot]
-
-                if sell_put_candidates and sell_call_candidates:
-                    sell_put_strike = min(sell_put_candidates, key=lambda x: abs(x - sym_put_target))
-                    sell_call_strike = min(sell_call_candidates, key=lambda x: abs(x - sym_call_target))
-                    sell_put_row = puts[puts["strike"] == sell_put_strike]
-                    sell_call_row = calls[calls["strike"] == sell_call_strike]
-                    if not sell_put_row.empty:
-                        sell_put = sell_put_row.iloc[0]
-                    if not sell_call_row.empty:
-                        sell_call = sell_call_row.iloc[0]
-
-                target_width = max(1.0, round(spot * 0.015))
-                put_strikes = sorted(puts["strike"].unique())
-                call_strikes = sorted(calls["strike"].unique())
+                sym_put_strike = _nearest_strike(put_strikes, sym_put_target, below=spot)
+                sym_call_strike = _nearest_strike(call_strikes, sym_call_target, above=spot)
+
+                if sym_put_strike is not None and sym_call_strike is not None:
+                    sell_put_strike, sell_call_strike = sym_put_strike, sym_call_strike
+                    sell_put = put_by_strike[sell_put_strike]
+                    sell_call = call_by_strike[sell_call_strike]
 
                 buy_put_target = sell_put_strike - target_width
-                candidates_put = [s for s in put_strikes if s < sell_put_strike]
-                if not candidates_put:
+                buy_put_strike = _nearest_strike(put_strikes, buy_put_target, below=sell_put_strike)
+                if buy_put_strike is None:
                     raise ValueError("Pas de strikes de protection disponibles pour le Put side de l'Iron Condor.")
-                buy_put_strike = min(candidates_put, key=lambda x: abs(x - buy_put_target))
 
                 buy_call_target = sell_call_strike + target_width
-                candidates_call = [s for s in call_strikes if s > sell_call_strike]
-                if not candidates_call:
+                buy_call_strike = _nearest_strike(call_strikes, buy_call_target, above=sell_call_strike)
+                if buy_call_strike is None:
                     raise ValueError("Pas de strikes de protection disponibles pour le Call side de l'Iron Condor.")
-                buy_call_strike = min(candidates_call, key=lambda x: abs(x - buy_call_target))
 
-                sell_put_price = get_mid_price(sell_put)
-                sell_call_price = get_mid_price(sell_call)
+                sell_put_price = _leg_mid_price(sell_put)
+                sell_call_price = _leg_mid_price(sell_call)
 
-                buy_put_row = puts[puts["strike"] == buy_put_strike]
-                buy_call_row = calls[calls["strike"] == buy_call_strike]
-                buy_put_price = get_mid_price(buy_put_row.iloc[0]) if not buy_put_row.empty else 0.0
-                buy_call_price = get_mid_price(buy_call_row.iloc[0]) if not buy_call_row.empty else 0.0
+                buy_put_price = _leg_mid_price(put_by_strike.get(buy_put_strike))
+                buy_call_price = _leg_mid_price(call_by_strike.get(buy_call_strike))
 
                 net_credit = (sell_put_price + sell_call_price) - (buy_put_price + buy_call_price)
                 put_width = sell_put_strike - buy_put_strike
@@ -884,7 +904,7 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
 
 
     # --- Plan de vol (exit triggers) ---
-    exp_date = dt.datetime.strptime(exp_str, "%Y-%m-%d").date()
+    exp_date = dt.date.fromisoformat(exp_str)
     time_stop_date = exp_date - dt.timedelta(days=21)
     take_profit_amount = round(abs(result["max_profit"]) * 0.5, 2)
 
@@ -896,9 +916,11 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
 
     # --- Probabilités Réelles via Intégration Log-Normale (GBM) ---
     result["sigma"] = sigma
-    sigma_move = compute_historical_vol(ticker) or sigma
+    sigma_move = compute_historical_vol(ticker, hist=hist) or sigma
+    # Legs en structure de tableaux, partagée par les évaluations P&L (moteur et UI)
+    result["legs_soa"] = legs_to_soa(result["legs"])
     probs = compute_real_probabilities(
-        legs=result["legs"], spot=spot, dte=dte,
+        legs=result["legs_soa"], spot=spot, dte=dte,
         sigma=sigma, qty=1,
         take_profit=take_profit_amount,
         max_risk=result["max_risk"],
@@ -911,18 +933,15 @@ def build_strategy(spot: float, vix: float, iv_rank: float, bias: str,
     # --- Espérance Mathématique (EV) ---
     result["ev"] = probs["expected_pnl"]
 
-    # --- Calcul des Grecques agrégées ---
-    net_greeks = {"delta": 0, "gamma": 0, "theta": 0, "vega": 0, "iv": sigma * 100}
-    for leg in result["legs"]:
-        leg_T = leg["dte"] / 365.0
-        greeks = compute_leg_greeks(leg, spot, leg_T, sigma)
-        net_greeks["delta"] += greeks["delta"]
-        net_greeks["gamma"] += greeks["gamma"]
-        net_greeks["theta"] += greeks["theta"]
-        net_greeks["vega"] += greeks["vega"]
-    for k in ["delta", "gamma", "theta", "vega"]:
-        net_greeks[k] = round(net_greeks[k] * 100, 2)
-    net_greeks["iv"] = round(net_greeks["iv"], 1)
+    # --- Vecteurs par leg : prix et signe (SELL = +1, BUY = -1) ---
+    # Net crédit/débit par action = leg_prices · leg_signs
+    result["leg_prices"] = result["legs_soa"]["price"]
+    result["leg_signs"] = (-result["legs_soa"]["sign"]).astype(np.int8)
+
+    # --- Calcul des Grecques agrégées (tous les legs en un passage, BUY = +1) ---
+    leg_greeks = compute_strategy_greeks(result["legs_soa"], spot, sigma)
+    net_greeks = {k: round(float(v.sum() * 100), 2) for k, v in leg_greeks.items()}
+    net_greeks["iv"] = round(sigma * 100, 1)
     result["greeks"] = net_greeks
 
     # --- Multiplicateur de quantité (Position Sizing) ---
@@ -4,13 +4,14 @@ test_app.py — Suite de Tests Unitaires du Robo-Advisor d'Options
 Framework : pytest + unittest.mock
 Objectif  : Tests 100% déterministes (aucun appel réseau, marché figé).
 
-6 suites :
+7 suites :
   1. Le Moteur Mathématique (Black-Scholes)
   2. Le Routage Stratégique (L'Aiguilleur)
   3. Le Risk Manager (Dimensionnement, Budget, Métriques)
   4. Les Filtres de Sécurité (Kill Switches)
   5. Le Golden Dataset (12 scénarios paramétrés — P&L déterministes)
   6. Les Invariants de Probabilité (cohérence structurelle post-fix d2)
+  7. Les Indicateurs Techniques (noyaux NumPy/Numba vs référence pandas)
 """
 
 import sys
@@ -58,12 +59,21 @@ from app import (
     compute_real_probabilities,
     simulate_pnl,
 )
+from engine.indicators import compute_iv_rank, compute_historical_vol, _rsi_core
 
 
 # ═══════════════════════════════════════════════
 # HELPERS
 # ═══════════════════════════════════════════════
 
+@pytest.fixture(autouse=True)
+def _offline_realized_vol():
+    """build_strategy sans `hist` télécharge la vol. réalisée : forcée à None
+    (fallback sur l'IV), comme hors réseau, pour des tests déterministes."""
+    with patch("engine.strategy.compute_historical_vol", return_value=None):
+        yield
+
+
 def _make_options_df(rows):
     defaults = {
         "contractSymbol": "MOCK", "lastTradeDate": "2026-03-15",
@@ -138,6 +148,78 @@ class TestBlackScholes:
     def test_put_delta(self):
         assert black_scholes_delta(self.S, self.K, self.T, self.r, self.sigma, "put") == pytest.approx(-0.46, abs=0.02)
 
+    @pytest.mark.parametrize("opt_type", ["call", "put"])
+    def test_kernels_match_scipy_reference(self, opt_type):
+        """Noyaux compilés (math.erfc) vs formules scipy.stats sur une grille."""
+        from scipy.stats import norm
+        from engine.black_scholes import (
+            black_scholes_gamma, black_scholes_theta, black_scholes_vega,
+        )
+        for S in (50.0, 95.0, 100.0, 130.0):
+            for T in (1 / 365.0, 30 / 365.0, 1.0):
+                for sigma in (0.05, 0.25, 1.2):
+                    d1 = (np.log(S / self.K) + (self.r + 0.5 * sigma**2) * T) / (sigma * np.sqrt(T))
+                    d2 = d1 - sigma * np.sqrt(T)
+                    disc = self.K * np.exp(-self.r * T)
+                    if opt_type == "call":
+                        price, delta = S * norm.cdf(d1) - disc * norm.cdf(d2), norm.cdf(d1)
+                        theta = -(S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T)) - self.r * disc * norm.cdf(d2)
+                    else:
+                        price, delta = disc * norm.cdf(-d2) - S * norm.cdf(-d1), norm.cdf(d1) - 1
+                        theta = -(S * norm.pdf(d1) * sigma) / (2 * np.sqrt(T)) + self.r * disc * norm.cdf(-d2)
+                    args = (S, self.K, T, self.r, sigma)
+                    assert black_scholes_price(*args, opt_type) == pytest.approx(price, abs=1e-9)
+                    assert black_scholes_delta(*args, opt_type) == pytest.approx(delta, abs=1e-12)
+                    assert black_scholes_theta(*args, opt_type) == pytest.approx(theta / 365, abs=1e-9)
+                    assert black_scholes_gamma(*args) == pytest.approx(norm.pdf(d1) / (S * sigma * np.sqrt(T)), abs=1e-12)
+                    assert black_scholes_vega(*args) == pytest.approx(S * norm.pdf(d1) * np.sqrt(T) / 100, abs=1e-12)
+
+    @pytest.mark.parametrize("opt_type", ["call", "put"])
+    def test_greeks_grid_matches_scalar(self, opt_type):
+        """compute_greeks_grid / compute_delta_grid (vectoriels sur K) = fonctions scalaires."""
+        from engine.black_scholes import (
+            compute_greeks_grid, compute_delta_grid,
+            black_scholes_gamma, black_scholes_theta, black_scholes_vega,
+        )
+        strikes = np.linspace(60.0, 140.0, 33)
+        for T, sigma in ((30 / 365.0, 0.25), (2 / 365.0, 0.9), (0.0, 0.25), (30 / 365.0, 0.0)):
+            grid = compute_greeks_grid(self.S, strikes, T, sigma, opt_type)
+            args = [(self.S, K, T, self.r, sigma) for K in strikes]
+            np.testing.assert_allclose(grid["delta"], [black_scholes_delta(*a, opt_type) for a in args], atol=1e-12)
+            np.testing.assert_allclose(compute_delta_grid(self.S, strikes, T, sigma, opt_type), grid["delta"], atol=1e-12)
+            np.testing.assert_allclose(grid["gamma"], [black_scholes_gamma(*a) for a in args], atol=1e-12)
+            np.testing.assert_allclose(grid["theta"], [black_scholes_theta(*a, opt_type) for a in args], atol=1e-9)
+            np.testing.assert_allclose(grid["vega"], [black_scholes_vega(*a) for a in args], atol=1e-12)
+
+    def test_strategy_greeks_match_per_leg(self):
+        """compute_strategy_greeks (tous les legs, T par leg) = grecques leg par leg signées."""
+        from engine.black_scholes import compute_strategy_greeks, leg_greeks_vector, legs_to_soa
+        legs = [
+            {"type": "Call", "action": "BUY", "strike": 95.0, "price": 7.1, "dte": 365},
+            {"type": "Call", "action": "SELL", "strike": 105.0, "price": 1.9, "dte": 30},
+            {"type": "PUT", "action": "SELL", "strike": 92.0, "price": 0.8, "dte": 30},
+            {"type": "Put", "action": "BUY", "strike": 88.0, "price": 0.4, "dte": 0},
+        ]
+        greeks = compute_strategy_greeks(legs_to_soa(legs), self.S, 0.3)
+        expected = np.array([
+            (1 if leg["action"] == "BUY" else -1) * leg_greeks_vector(leg, self.S, leg["dte"] / 365.0, 0.3)
+            for leg in legs
+        ])
+        for col, name in enumerate(("delta", "gamma", "theta", "vega")):
+            np.testing.assert_allclose(greeks[name], expected[:, col], atol=1e-5)
+
+    def test_take_profit_spot_beyond_20pct_via_sweep(self):
+        """TP atteint entre +20 % et +25 % : trouvé via sweep= comme sans courbe."""
+        from engine.black_scholes import estimate_take_profit_spot, make_pnl_fn
+        legs = [{"type": "Call", "action": "BUY", "strike": 100.0, "price": 2.5, "dte": 30}]
+        pnl_at = make_pnl_fn(legs, 0, 0.25, 1)
+        take_profit = float(pnl_at(122.5))
+        spots = np.linspace(70.0, 130.0, 121)
+        sweep = (spots, pnl_at(spots))
+        for kwargs in ({}, {"sweep": sweep}):
+            tp_spot = estimate_take_profit_spot(legs, self.S, 0, 0.25, 1, take_profit, **kwargs)
+            assert tp_spot == pytest.approx(122.5, abs=0.05)
+
 
 # ═══════════════════════════════════════════════
 # TEST 2 : LE ROUTAGE STRATÉGIQUE
@@ -187,6 +269,17 @@ class TestStrategyRouting:
     def test_mid_vol_neutral_iron_condor(self):
         assert "Iron Condor" in self._run_routing(18, 30, "Neutre")["name"]
 
+    def test_chain_context_cache_thread_safe(self):
+        """Le cache des contextes de chaîne reste borné sous accès concurrents (scanner)."""
+        from concurrent.futures import ThreadPoolExecutor
+        from engine import strategy
+        chains = [_make_basic_chain() for _ in range(3 * strategy._CHAIN_CONTEXT_MAX)]
+        with patch.object(strategy, "_chain_contexts", type(strategy._chain_contexts)()):
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                ctxs = list(executor.map(lambda c: strategy._chain_context(c[1], c[0]), chains * 2))
+            assert len(strategy._chain_contexts) <= strategy._CHAIN_CONTEXT_MAX
+        assert all(len(ctx["calls"]) == len(chains[0][1]) for ctx in ctxs)
+
 
 # ═══════════════════════════════════════════════
 # TEST 3 : LE RISK MANAGER
@@ -494,6 +587,16 @@ class TestGoldenDataset:
             assert actual == pytest.approx(expected_pnl, abs=0.50), \
                 f"Test {scenario['id']} @ spot={target_spot}: P&L attendu ${expected_pnl:+.2f}, obtenu ${actual:+.2f}"
 
+    @pytest.mark.parametrize("scenario", GOLDEN_SCENARIOS)
+    def test_pnl_vectorized_matches_scalar(self, scenario):
+        """simulate_pnl sur un tableau de spots == appels scalaires point par point."""
+        legs, sigma, qty = scenario["legs"], scenario["sigma"], scenario["qty"]
+        remaining_dte = min(21, scenario["dte"])
+        spots = np.linspace(50.0, 150.0, 41)
+        curve = simulate_pnl(legs, spots, remaining_dte, sigma, qty)
+        expected = [simulate_pnl(legs, float(s), remaining_dte, sigma, qty) for s in spots]
+        np.testing.assert_allclose(curve, expected, atol=0.01)
+
 
 # ═══════════════════════════════════════════════
 # TEST 6 : INVARIANTS DE PROBABILITÉ (post-fix d2)
@@ -556,3 +659,155 @@ class TestProbabilityInvariants:
         p = compute_real_probabilities(legs, spot, dte, sigma, qty, tp, mr)
         assert p["p_max_loss"] >= 0.1, \
             f"P(Max Loss) d'un BPS OTM devrait être ≥0.1%, got {p['p_max_loss']}%"
+
+    @staticmethod
+    def _fine_grid_probabilities(legs, spot, dte, sigma, qty, tp, mr, sigma_move):
+        """Référence : intégration directe sur une grille fine z ∈ [-8, 8]."""
+        from engine.black_scholes import make_pnl_fn, RISK_FREE_RATE
+        T_holding = max(1, dte - 21) / 365.0
+        z = np.linspace(-8, 8, 20001)
+        weights = np.exp(-0.5 * z * z) / np.sqrt(2 * np.pi) * (z[1] - z[0])
+        s_t = spot * np.exp((RISK_FREE_RATE - 0.5 * sigma_move**2) * T_holding
+                            + sigma_move * np.sqrt(T_holding) * z)
+        pnl = make_pnl_fn(legs, min(21, dte), sigma, qty)(s_t)
+        return {
+            "p_take_profit": 100 * weights[pnl >= tp].sum(),
+            "p_breakeven": 100 * weights[pnl >= 0].sum(),
+            "p_max_loss": 100 * weights[pnl <= -mr * 0.95].sum(),
+            "expected_pnl": float(pnl @ weights),
+        }
+
+    def test_quadrature_matches_fine_grid(self):
+        """Forme fermée (verticaux) et quadrature rejoignent une grille fine."""
+        for legs, spot, dte, sigma, qty, tp, mr in self.SCENARIOS:
+            ref = self._fine_grid_probabilities(legs, spot, dte, sigma, qty, tp, mr, 0.3)
+            default = compute_real_probabilities(legs, spot, dte, sigma, qty, tp, mr, sigma_move=0.3)
+            with patch("engine.black_scholes._is_vertical", return_value=False):
+                quadrature = compute_real_probabilities(legs, spot, dte, sigma, qty, tp, mr, sigma_move=0.3)
+            for p in (default, quadrature):
+                for key in ["p_take_profit", "p_breakeven", "p_max_loss"]:
+                    assert p[key] == pytest.approx(ref[key], abs=0.15), key
+                assert p["expected_pnl"] == pytest.approx(ref["expected_pnl"], abs=0.05)
+
+    def test_narrow_take_profit_zone(self):
+        """Une zone de TP plus étroite que l'écart des nœuds de quadrature est captée."""
+        legs = [{"action": "BUY",  "type": "Put",  "strike": 88,  "exp": "x", "dte": 45, "price": 0.5},
+                {"action": "SELL", "type": "Put",  "strike": 93,  "exp": "x", "dte": 45, "price": 1.2},
+                {"action": "SELL", "type": "Call", "strike": 107, "exp": "x", "dte": 45, "price": 1.2},
+                {"action": "BUY",  "type": "Call", "strike": 112, "exp": "x", "dte": 45, "price": 0.5}]
+        args = (legs, 100, 45, 0.30, 1, 40, 300)
+        ref = self._fine_grid_probabilities(*args, 0.5)
+        p = compute_real_probabilities(*args, sigma_move=0.5)
+        assert ref["p_take_profit"] > 5
+        for key in ["p_take_profit", "p_breakeven", "p_max_loss"]:
+            assert p[key] == pytest.approx(ref[key], abs=0.15), key
+        assert p["expected_pnl"] == pytest.approx(ref["expected_pnl"], abs=0.05)
+
+
+# ═══════════════════════════════════════════════
+# TEST 7 : INDICATEURS TECHNIQUES
+# ═══════════════════════════════════════════════
+
+class TestIndicators:
+    """Les noyaux NumPy/Numba reproduisent les calculs pandas de référence."""
+
+    @staticmethod
+    def _hist(n, seed):
+        rng = np.random.default_rng(seed)
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        return pd.DataFrame({"Close": close})
+
+    @pytest.mark.parametrize("n, seed", [(30, 0), (60, 1), (252, 2)])
+    def test_iv_rank_matches_pandas(self, n, seed):
+        hist = self._hist(n, seed)
+        log_returns = np.log(hist["Close"] / hist["Close"].shift(1)).dropna()
+        rolling_vol = log_returns.rolling(window=20).std().dropna()
+        expected = 100.0 * (rolling_vol.iloc[-1] - rolling_vol.min()) / (rolling_vol.max() - rolling_vol.min())
+        assert compute_iv_rank("X", hist=hist) == pytest.approx(round(float(expected), 1), abs=1e-9)
+
+    @pytest.mark.parametrize("n, seed", [(31, 0), (63, 1)])
+    def test_historical_vol_matches_pandas(self, n, seed):
+        hist = self._hist(n, seed)
+        log_returns = np.log(hist["Close"] / hist["Close"].shift(1)).dropna()
+        expected = float(log_returns.tail(30).std() * np.sqrt(252))
+        assert compute_historical_vol("X", hist=hist) == pytest.approx(expected, rel=1e-12)
+
+    def test_iv_rank_insufficient_history(self):
+        with pytest.raises(ValueError, match=r"(?i)insuffisant"):
+            compute_iv_rank("X", hist=self._hist(20, 0))
+
+    @pytest.mark.parametrize("n, seed", [(15, 0), (126, 1)])
+    def test_rsi_matches_pandas(self, n, seed):
+        hist = self._hist(n, seed)
+        delta = hist["Close"].diff()
+        gain = delta.where(delta > 0, 0).ewm(span=14, adjust=False).mean()
+        loss = (-delta.where(delta < 0, 0)).ewm(span=14, adjust=False).mean()
+        expected = float((100 - 100 / (1 + gain / loss)).iloc[-1])
+        assert _rsi_core(hist["Close"].to_numpy(), 14) == pytest.approx(expected, abs=1e-9)
+
+    @pytest.mark.parametrize("n, seed", [(30, 0), (126, 1)])
+    def test_sma50_matches_pandas(self, n, seed):
+        from engine import indicators
+        hist = self._hist(n, seed)
+        close = hist["Close"]
+        expected = close.rolling(50).mean().iloc[-1] if n >= 50 else close.mean()
+        with patch.object(indicators, "_earnings_date", return_value=None):
+            adv = indicators.compute_trend_and_risk_data("X", 100.0, "Neutre", 45, 300, 20, 200, hist=hist)
+        assert adv["sma50"] == pytest.approx(float(expected), rel=1e-12)
+
+    def test_earnings_calendar_fetched_once_per_ticker(self):
+        """Le calendrier des résultats n'est interrogé qu'une fois pour les 3 biais."""
+        from engine import indicators
+        earnings = dt.date.today() + dt.timedelta(days=10)
+        hist = self._hist(60, 0)
+        with patch.dict(indicators._earnings_cache, clear=True), \
+             patch("engine.indicators.yf.Ticker") as ticker:
+            ticker.return_value.calendar = {"Earnings Date": [earnings]}
+            risks = [
+                indicators.compute_trend_and_risk_data("X", 100.0, b, 45, 300, 20, 200, hist=hist)["earnings_risk"]
+                for b in ("Haussier", "Neutre", "Baissier")
+            ]
+        assert ticker.call_count == 1
+        assert risks == ["⚠️ Danger"] * 3
+
+
+# ═══════════════════════════════════════════════
+# TEST 8 : CACHES MÉMOIRE DU PROVIDER YFINANCE
+# ═══════════════════════════════════════════════
+
+class TestProviderCaches:
+    """Caches du module bornés et sûrs sous les threads du scanner."""
+
+    def test_expiry_cache_bounded_under_threads(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from data import yfinance_provider as yfp
+        exp = (dt.date.today() + dt.timedelta(days=45)).isoformat()
+        tickers = [f"T{i}" for i in range(3 * yfp._EXPIRY_MAX)]
+        with patch.object(yfp, "_expiry_cache", type(yfp._expiry_cache)()), \
+             patch("data.yfinance_provider.yf.Ticker") as ticker:
+            ticker.return_value.options = (exp,)
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(yfp._expirations, tickers))
+            assert len(yfp._expiry_cache) == yfp._EXPIRY_MAX
+            # Les plus récents restent servis sans nouvel appel
+            calls = ticker.call_count
+            yfp._expirations(next(iter(reversed(yfp._expiry_cache))))
+            assert ticker.call_count == calls
+        assert all(parsed == [(45, exp)] for _, parsed in results)
+
+    def test_chain_disk_cache_only_before_process_start(self, tmp_path):
+        """Le parquet d'une chaîne n'est relu qu'après un redémarrage (fichier antérieur)."""
+        from unittest.mock import MagicMock
+        from data import yfinance_provider as yfp
+        pytest.importorskip("pyarrow")
+        puts, calls = _make_basic_chain()
+        tk = MagicMock()
+        tk.option_chain.return_value.calls, tk.option_chain.return_value.puts = calls, puts
+        with patch.object(yfp, "CHAIN_CACHE_DIR", tmp_path):
+            yfp._option_chain(tk, "X", "2099-01-01")  # écrit le parquet
+            yfp._option_chain(tk, "X", "2099-01-01")  # écrit par ce processus : pas relu
+            assert tk.option_chain.call_count == 2
+            with patch.object(yfp, "_PROCESS_START", yfp.time.time() + 1):
+                disk_calls, _ = yfp._option_chain(tk, "X", "2099-01-01")
+            assert tk.option_chain.call_count == 2
+        pd.testing.assert_frame_equal(disk_calls, calls)